@@ -0,0 +1,138 @@
+import os
+import json
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import reportlab
+
+# 基准测试用的合成数据：不依赖网络和真实的 graphics.txt，每次生成的内容完全相同
+
+# 常用字放在最前面，保证默认字表中的字都有数据
+COMMON_CHARS = "前后上下左右雨虫木尺本立正厂头里见在和也又才爸妈长只多办石半有牛羊心耳禾去了可东西竹马鸟是女开先关我"
+# 笔画数上限 (MakeMeAHanzi 中最多的字约 30 笔)
+MAX_STROKES = 30
+
+
+def fixture_chars(count):
+    """合成数据中的前 count 个汉字"""
+    chars = list(dict.fromkeys(COMMON_CHARS))
+    code = 0x4E00
+    while len(chars) < count:
+        char = chr(code)
+        code += 1
+        if char not in chars:
+            chars.append(char)
+    return chars[:count]
+
+
+def stroke_count(index, rng):
+    """第 index 个字的笔画数：前 MAX_STROKES 个字依次为 1..MAX_STROKES 笔，其余集中在 10 笔左右"""
+    if index < MAX_STROKES:
+        return index + 1
+    return max(1, min(MAX_STROKES, round(rng.triangular(1, MAX_STROKES, 9))))
+
+
+def _stroke_path(rng):
+    """一笔的轮廓：与 MakeMeAHanzi 相同的坐标系 (0..1024，y 向上，基线 -124..900)"""
+    parts = [f"M {rng.randint(100, 900)} {rng.randint(0, 800)}"]
+    for _ in range(rng.randint(6, 14)):
+        kind = rng.choice("QQQQLLC")
+        if kind == "Q":
+            parts.append("Q " + " ".join(str(rng.randint(-100, 1024)) for _ in range(4)))
+        elif kind == "L":
+            parts.append(f"L {rng.randint(0, 1024)} {rng.randint(-100, 900)}")
+        else:
+            parts.append("C " + " ".join(str(rng.randint(-100, 1024)) for _ in range(6)))
+    parts.append("Z")
+    return " ".join(parts)
+
+
+def generate_graphics(path, count=9000, seed=1):
+    """
+    生成与 graphics.txt 格式相同的合成笔顺数据
+    :return: {笔画数: 该笔画数的第一个汉字}
+    """
+    rng = random.Random(seed)
+    samples = {}
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, char in enumerate(fixture_chars(count)):
+            n = stroke_count(index, rng)
+            samples.setdefault(n, char)
+            entry = {
+                "character": char,
+                "strokes": [_stroke_path(rng) for _ in range(n)],
+                "medians": [[[rng.randint(0, 1024), rng.randint(-100, 900)] for _ in range(4)] for _ in range(n)],
+            }
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return samples
+
+
+def stub_font_path(font_path=None):
+    """
+    基准测试使用的字体：指定的字体，或 ReportLab 自带的 Vera.ttf (不含汉字，只作替身，
+    汉字会显示为缺字框，但字体解析、子集嵌入和文本绘制的流程相同)
+    """
+    if font_path and os.path.exists(font_path):
+        return os.path.abspath(font_path)
+    return os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+
+
+class _WordApiHandler(BaseHTTPRequestHandler):
+    """模拟 Ownthink 接口：对任何汉字返回固定格式的组词"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        char = parse_qs(urlsplit(self.path).query).get('entity', [''])[0]
+        if self.server.delay:
+            threading.Event().wait(self.server.delay)
+        self.server.requests += 1
+        data = {'message': 'success',
+                'data': {'avp': [['组词', f'{char}子、大{char}、{char}天、{char}们']]}}
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class WordApiStub:
+    """
+    本地组词接口替身，在后台线程中运行
+    :param delay: 每个请求的模拟网络延迟 (秒)
+    """
+
+    def __init__(self, delay=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _WordApiHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay
+        self.httpd.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/kg/knowledge"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
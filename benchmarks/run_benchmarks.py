@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+
+# 基准测试：用合成数据分别测量各阶段耗时，结果写入 JSON，并与保存的基线比较
+# 用法: python benchmarks/run_benchmarks.py [--save-baseline] [--sizes 50,500,5000]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import reportlab
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+
+from config import settings
+from benchmarks.fixtures import generate_graphics, fixture_chars, stub_font_path, WordApiStub
+from utils.stroke_manager import StrokeManager
+from utils.layout import layout
+from utils.render import RenderOptions, register_font_file, draw_page
+
+DEFAULT_RESULTS = os.path.join(ROOT, 'benchmarks', 'results.json')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+# 合成数据的汉字数 (需不少于最大的端到端字数)
+FIXTURE_CHARS = 9000
+# 单字阶段测量的笔画数
+STROKE_COUNTS = (1, 5, 10, 20, 30)
+# 绘制、组词阶段使用的字数
+SAMPLE_CHARS = 50
+# 比较基线时忽略小于该值的差异 (秒)，避免微小阶段的计时噪声被当作退化
+MIN_DELTA = 0.002
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测代码的进度输出"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(fn, repeat, setup=None, teardown=None, warmup=0):
+    """
+    重复运行 fn 并计时 (setup/teardown 不计时)
+    :param setup: 每次运行前调用，返回值作为 fn 的参数
+    :param warmup: 正式计时前额外运行的次数 (用于排除首次导入等一次性开销)
+    """
+    times = []
+    for i in range(warmup + repeat):
+        with quiet():
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            fn(arg) if setup else fn()
+            elapsed = time.perf_counter() - start
+            if teardown:
+                teardown(arg)
+        if i >= warmup:
+            times.append(elapsed)
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'max': max(times),
+        'repeat': repeat,
+    }
+
+
+class Benchmark:
+    """在临时目录中准备数据并运行各阶段测试"""
+
+    def __init__(self, workdir, font_path, repeat=5):
+        self.workdir = workdir
+        self.font_path = font_path
+        self.repeat = repeat
+        self.results = {}
+
+    def record(self, name, result, **extra):
+        result.update(extra)
+        self.results[name] = result
+        print(f"  {name:<36} {result['median'] * 1000:10.2f} ms  (最小 {result['min'] * 1000:.2f} ms, {result['repeat']} 次)")
+
+    def manager(self, geometry_cache=True):
+        """创建使用临时目录数据的 StrokeManager，并加载笔顺数据"""
+        sm = StrokeManager(renderer='native', data_dir=self.workdir)
+        with quiet():
+            sm._load_data()
+        if not geometry_cache and sm.geometry_cache is not None:
+            # 每次都重新解析路径，测量的是解析本身而不是缓存读取
+            sm.geometry_cache.close()
+            sm.geometry_cache = None
+        return sm
+
+    def _remove(self, *names):
+        for name in os.listdir(self.workdir):
+            if name.startswith(names):
+                os.remove(os.path.join(self.workdir, name))
+
+    def bench_load_data(self):
+        def fresh():
+            self._remove('graphics.idx', '.stroke_cache')
+            return StrokeManager(data_dir=self.workdir)
+
+        def warm():
+            return StrokeManager(data_dir=self.workdir)
+
+        def close(sm):
+            sm.close()
+
+        load = lambda sm: sm._load_data()
+        self.record('load_data.cold', measure(load, self.repeat, fresh, close))
+        self.record('load_data.warm', measure(load, self.repeat, warm, close))
+
+    def bench_strokes(self, samples):
+        sm = self.manager(geometry_cache=False)
+        height = RenderOptions.from_settings(settings).stroke_order_height
+        try:
+            for n in STROKE_COUNTS:
+                char = samples[n]
+                self.record(f'get_stroke_drawings.strokes_{n:02d}',
+                            measure(lambda: sm.get_stroke_drawings(char, size=height), self.repeat * 4, warmup=1),
+                            char=char)
+
+                def clear():
+                    sm._stroke_paths.clear()
+                self.record(f'get_stroke_paths.strokes_{n:02d}',
+                            measure(lambda _: sm.get_stroke_paths(char, height), self.repeat * 4, clear, warmup=1),
+                            char=char)
+        finally:
+            sm.close()
+
+    def bench_drawing(self, font_name):
+        chars = fixture_chars(SAMPLE_CHARS)
+        options = RenderOptions.from_settings(settings, font_path=self.font_path)
+        height = options.stroke_order_height
+
+        sm = self.manager(geometry_cache=False)
+        try:
+            with quiet():
+                sm.prefetch_words(chars)
+
+            def draw_strokes(c):
+                for i, char in enumerate(chars):
+                    sm.draw_stroke_order(c, char, 20, 20 + (i % 40) * 20, height, font_name)
+
+            def cold():
+                sm._stroke_paths.clear()
+                return canvas.Canvas(os.path.join(self.workdir, 'strokes.pdf'), pagesize=A4)
+
+            def warm():
+                return canvas.Canvas(os.path.join(self.workdir, 'strokes.pdf'), pagesize=A4)
+
+            self.record('draw_stroke_order.cold', measure(draw_strokes, self.repeat, cold, warmup=1), chars=len(chars))
+            self.record('draw_stroke_order.warm', measure(draw_strokes, self.repeat, warm), chars=len(chars))
+        finally:
+            sm.close()
+
+        plain = options.replace(show_stroke_order=False)
+        pages = layout(chars, plain)
+
+        def new_canvas():
+            return canvas.Canvas(os.path.join(self.workdir, 'grid.pdf'), pagesize=plain.page_size)
+
+        def draw_pages(c):
+            for page in pages:
+                draw_page(c, page, plain, font_name)
+                c.showPage()
+        self.record('draw_grid_and_chars', measure(draw_pages, self.repeat, new_canvas, warmup=1),
+                    chars=len(chars), pages=len(pages))
+
+    def bench_words(self):
+        chars = fixture_chars(SAMPLE_CHARS)
+
+        def fresh():
+            self._remove('.words_cache')
+            sm = StrokeManager(data_dir=self.workdir)
+            sm._ensure_words()
+            return sm
+
+        def lookup_all(sm):
+            for char in chars:
+                sm.get_words(char)
+
+        def close(sm):
+            sm.close()
+
+        self.record('get_words.cold', measure(lookup_all, self.repeat, fresh, close), chars=len(chars))
+        self.record('prefetch_words.cold', measure(lambda sm: sm.prefetch_words(chars), self.repeat, fresh, close),
+                    chars=len(chars))
+
+        sm = fresh()
+        try:
+            lookup_all(sm)
+            self.record('get_words.warm', measure(lambda: lookup_all(sm), self.repeat), chars=len(chars))
+        finally:
+            sm.close()
+
+    def bench_end_to_end(self, sizes):
+        import create_practice_pdf
+        output_path = os.path.join(self.workdir, 'practice.pdf')
+        for size in sizes:
+            chars = fixture_chars(size)
+            # 组词和笔顺几何缓存已就绪 (与日常重复生成相同)，第一次运行不计时
+            sm = self.manager()
+            try:
+                repeat = max(1, self.repeat if size <= 500 else self.repeat // 3)
+                run = lambda: create_practice_pdf.create_practice_pdf(chars, output_path, stroke_manager=sm,
+                                                                      workers=1, use_cache=False)
+                self.record(f'create_practice_pdf.chars_{size}', measure(run, repeat, warmup=1),
+                            chars=size, bytes=os.path.getsize(output_path))
+            finally:
+                sm.close()
+
+
+def compare(results, baseline, threshold):
+    """与基线比较，返回退化的阶段名称列表"""
+    regressions = []
+    print(f"\n与基线比较 (中位数，超过 {threshold:.0%} 视为退化):")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"  {name:<36} {result['median'] * 1000:10.2f} ms  (基线中没有)")
+            continue
+        change = result['median'] / base['median'] - 1 if base['median'] else 0
+        regressed = change > threshold and result['median'] - base['median'] > MIN_DELTA
+        flag = "  <-- 退化" if regressed else ""
+        print(f"  {name:<36} {result['median'] * 1000:10.2f} ms  基线 {base['median'] * 1000:10.2f} ms  {change:+7.1%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def environment(font_path):
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'reportlab': reportlab.Version,
+        'font': os.path.basename(font_path),
+        'fixture_chars': FIXTURE_CHARS,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汉字练习纸生成流程的基准测试")
+    parser.add_argument('--sizes', default='50,500,5000', help="端到端测试的字数，逗号分隔 (默认 50,500,5000)")
+    parser.add_argument('--repeat', type=int, default=5, help="每个阶段的重复次数 (默认 5，取中位数)")
+    parser.add_argument('--font', default=None, help="使用的字体 (默认 ReportLab 自带的 Vera.ttf 作为替身)")
+    parser.add_argument('--output', default=DEFAULT_RESULTS, help="结果文件 (JSON)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件 (JSON)")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--threshold', type=float, default=0.2, help="中位数变慢超过该比例视为退化 (默认 0.2)")
+    parser.add_argument('--only', default=None, help="只运行指定阶段，逗号分隔: load,strokes,draw,words,e2e")
+    parser.add_argument('--keep', action='store_true', help="保留临时目录 (合成数据和生成的 PDF)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if sizes and max(sizes) > FIXTURE_CHARS:
+        parser.error(f"端到端字数不能超过合成数据的字数 {FIXTURE_CHARS}")
+    stages = set(args.only.split(',')) if args.only else {'load', 'strokes', 'draw', 'words', 'e2e'}
+
+    workdir = tempfile.mkdtemp(prefix='hanzi-bench-')
+    font_path = stub_font_path(args.font)
+    stub = WordApiStub().start()
+
+    # 所有数据、缓存和输出都在临时目录中，不影响项目 data 目录
+    settings.FONT_PATH = font_path
+    settings.OUTPUT_DIR = workdir
+    settings.OUTPUT_CACHE_MAX_SIZE = 0
+    settings.RENDER_WORKERS = 1
+    settings.STROKE_RENDERER = 'native'
+    settings.WORDS_API_URL = stub.url
+    settings.WORDS_API_RATE = 100000  # 不限流，测量的是本地开销
+
+    try:
+        print(f"生成合成笔顺数据 ({FIXTURE_CHARS} 字): {workdir}")
+        samples = generate_graphics(os.path.join(workdir, 'graphics.txt'), FIXTURE_CHARS)
+        with quiet():
+            font_name = register_font_file(font_path)
+        print(f"字体: {font_path}")
+
+        bench = Benchmark(workdir, font_path, args.repeat)
+        if 'load' in stages:
+            bench.bench_load_data()
+        if 'strokes' in stages:
+            bench.bench_strokes(samples)
+        if 'draw' in stages:
+            bench.bench_drawing(font_name)
+        if 'words' in stages:
+            bench.bench_words()
+        if 'e2e' in stages:
+            bench.bench_end_to_end(sizes)
+    finally:
+        stub.stop()
+        if args.keep:
+            print(f"临时目录已保留: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'environment': environment(font_path), 'results': bench.results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"已保存为基线: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("没有基线文件，跳过比较 (使用 --save-baseline 保存)。")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('environment', {}).get('platform') != report['environment']['platform']:
+        print("注意: 基线是在不同的环境中测得的，比较结果仅供参考。")
+    regressions = compare(bench.results, baseline.get('results', {}), args.threshold)
+    if regressions:
+        print(f"\n发现 {len(regressions)} 个阶段变慢: {', '.join(regressions)}")
+        return 1
+    print("\n没有发现性能退化。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,11 +21,25 @@ OUTPUT_FILENAME = "hanzi_practice.pdf"
 # 3. 字体路径 (Windows 默认楷体路径)
 # 如果是 Mac 或 Linux，请修改为对应的字体路径
 FONT_PATH = r"C:\Windows\Fonts\simkai.ttf"
+# 为 True 时把全部 ASCII 字符嵌入 PDF (ReportLab 默认行为，便于复制英文)；False 时只嵌入实际用到的字符，文件更小
+# 字体解析结果缓存在 data/.font_cache，字体文件不变时不再重复解析
+FONT_SUBSET_ASCII = False
+# 字在田字格中的对齐方式: "glyph" 按字形的实际边界居中 (适用于任何字体)；"legacy" 按旧版的固定比例估算基线
+CHAR_CENTERING = "glyph"
 
 # 4. 笔顺设置
 SHOW_STROKE_ORDER = True     # 是否显示笔顺
 STROKE_DATA_PATH = os.path.join(BASE_DIR, 'data', 'graphics.txt') # 笔顺数据文件路径
 PROXY_URL = "socks5://10.11.11.3:7895" # 下载笔顺数据时的代理，如果不需要请设为 None
+STROKE_DATA_URL = None        # 笔顺数据下载地址，None 使用 MakeMeAHanzi 的 GitHub 地址
+STROKE_DATA_SHA256 = None     # 下载后校验的 SHA-256，None 只校验长度 (下载日志中会输出实际的 SHA-256，可填在这里固定版本)
+STROKE_RENDERER = "native"   # 笔画路径转换方式: "native" (内置解析器，更快) 或 "svglib"
+STROKE_CACHE_MAX_SIZE = 50 * 1024 * 1024 # 笔顺几何缓存 (data/.stroke_cache.sqlite) 的容量上限 (字节)，设为 0 关闭缓存
+STROKE_MEMORY_CACHE_SIZE = 1000 # 内存中最多保留多少个汉字的笔顺数据 (超出时淘汰最久未用的)
+WORDS_CACHE_FLUSH_INTERVAL = 30 # 组词缓存写盘间隔 (秒)，程序结束时也会写盘
+WORDS_API_URL = "https://api.ownthink.com/kg/knowledge" # 组词查询接口
+WORDS_API_RATE = 5           # 组词接口限流: 每秒最多请求数
+WORDS_API_WORKERS = 4        # 组词接口并发数
 
 # 5. 样式设置
 GRID_SIZE = 13 * mm          # 田字格大小
@@ -48,6 +62,25 @@ HEADER_HEIGHT = 26 * mm      # 顶部标题区域高度
 BOTTOM_MARGIN = 16 * mm      # 底部留白
 STROKE_ORDER_HEIGHT = 5 * mm # 笔顺行高度
 
+# 分页并行渲染: 大于 1 时把页面分块交给多个进程绘制，再用 pypdf 合并 (需安装 pypdf)
+# 适合上百页的长文档；页数少时多进程的启动开销反而更大
+RENDER_WORKERS = 1
+
+# 流式生成 (--stream) 时每个分卷的页数，0 表示全部写入一个文件 (内存随页数增长)
+STREAM_PAGES_PER_FILE = 50
+
+# 图片输出 (--format svg/png): 按与 PDF 相同的版面把每页直接绘制为 SVG 或 PNG (PNG 需安装 Pillow)
+IMAGE_DPI = 150              # PNG 的分辨率，缩略图可用 72
+
+# 生成结果缓存: 汉字、排版样式、字体、笔顺数据、组词和日期都相同时直接复制上次生成的 PDF
+OUTPUT_CACHE_MAX_SIZE = 200 * 1024 * 1024 # 缓存 (data/.output_cache) 的容量上限 (字节)，设为 0 关闭
+
+# 7. 服务模式 (python create_practice_pdf.py --serve)
+SERVER_HOST = "127.0.0.1"    # 监听地址，局域网访问可改为 "0.0.0.0"
+SERVER_PORT = 8000           # 监听端口
+SERVER_MAX_CHARS = 1000      # 单次请求最多的汉字数
+SERVER_PREVIEW_DPI = 72      # /preview 返回的 PNG 缩略图的默认分辨率
+
 # 笔顺设置
 SHOW_STROKE_ORDER = True
 STROKE_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'graphics.txt')
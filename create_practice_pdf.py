@@ -1,13 +1,8 @@
 import os
 import sys
-import datetime
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib import colors
-from utils.stroke_manager import StrokeManager
+import logging
+import argparse
+from utils import startup
 
 # 导入配置
 # 将当前目录添加到 sys.path 以便能找到 config 模块
@@ -18,241 +13,201 @@ except ImportError:
     # 如果直接运行脚本，可能需要这样导入
     import config.settings as settings
 
-# ===========================================
-
-def register_font():
-    """注册中文字体"""
-    font_name = 'KaiTi'
-    try:
-        if os.path.exists(settings.FONT_PATH):
-            pdfmetrics.registerFont(TTFont(font_name, settings.FONT_PATH))
-            return font_name
-        else:
-            # 尝试备用字体 SimHei
-            backup_font = r"C:\Windows\Fonts\simhei.ttf"
-            if os.path.exists(backup_font):
-                print(f"未找到楷体，使用黑体: {backup_font}")
-                pdfmetrics.registerFont(TTFont('SimHei', backup_font))
-                return 'SimHei'
-            else:
-                print("错误：未找到中文字体文件。请检查 config/settings.py 中的 FONT_PATH 设置。")
-                return None
-    except Exception as e:
-        print(f"字体注册失败: {e}")
-        return None
-
-def draw_tian_grid(c, x, y, size):
-    """绘制单个田字格"""
-    # 保存当前状态
-    c.saveState()
-    
-    # 1. 画外框 (实线)
-    c.setLineWidth(1)
-    c.setStrokeColor(settings.GRID_COLOR)
-    c.rect(x, y, size, size)
-    
-    # 2. 画内部十字 (虚线)
-    c.setLineWidth(0.3)
-    c.setDash([2, 2], 0) # 虚线样式: 2点实, 2点空
-    c.setStrokeColor(settings.GRID_COLOR)
-    
-    # 横中线
-    c.line(x, y + size/2, x + size, y + size/2)
-    # 竖中线
-    c.line(x + size/2, y, x + size/2, y + size)
-    
-    # 恢复状态
-    c.restoreState()
+from utils import metrics
+from utils.output_cache import OutputCache
+from utils.font_cache import reset_embedded_bytes, embedded_bytes
+from utils.render import RenderOptions, RenderContext, render, render_stream, iter_chars, resolve_font_path, font_load_info
 
-def draw_char(c, char, x, y, size, font_name, style='solid'):
-    """绘制汉字"""
-    c.saveState()
-    
-    font_size = size * 0.85 # 字体大小占格子的 85%
-    c.setFont(font_name, font_size)
-    
-    # 计算居中位置
-    # 垂直居中需要根据基线微调，楷体通常基线偏低
-    # 简单估算：基线在格子底部向上 15%-20% 处
-    text_y = y + (size - font_size) / 2 + font_size * 0.15 
-    center_x = x + size / 2
-    
-    if style == 'solid':
-        # 黑色实体字
-        c.setFillColor(settings.TEXT_COLOR_SOLID)
-        c.drawCentredString(center_x, text_y, char)
-        
-    elif style == 'dashed':
-        # 虚线/描红字
-        # 方案 A: 浅灰色填充 (最推荐，适合描红)
-        c.setFillColor(settings.TEXT_COLOR_DASHED)
-        c.drawCentredString(center_x, text_y, char)
-        
-    c.restoreState()
+startup.mark("导入模块")
 
-def draw_header(c, page_width, page_height, font_name):
-    """绘制页面标题"""
-    c.saveState()
-    
-    # 标题
-    c.setFont(font_name, 24)
-    c.setFillColor(colors.black)
-    c.drawCentredString(page_width / 2, page_height - 18 * mm, "渤仔生字专项练习")
-    
-    # 姓名和日期
-    c.setFont(font_name, 12)
-    # 计算右边距，与田字格对齐
-    total_grid_width = settings.GRID_COUNT_PER_ROW * settings.GRID_SIZE
-    margin_x = (page_width - total_grid_width) / 2
-    right_align_x = page_width - margin_x
-    
-    # 获取日期文本
-    date_text = "________年____月______日"
-    if hasattr(settings, 'DATE_TEXT'):
-        if settings.DATE_TEXT == 'today':
-            now = datetime.datetime.now()
-            date_text = now.strftime("%Y年%m月%d日")
-        elif settings.DATE_TEXT:
-            date_text = settings.DATE_TEXT
-
-    c.drawRightString(right_align_x, page_height - 26 * mm, date_text)
-    
-    c.restoreState()
+# ===========================================
 
-def draw_page_number(c, page_num, page_width):
-    """绘制页码"""
-    c.saveState()
-    c.setFont("Helvetica", 10)
-    c.setFillColor(colors.black)
-    c.drawCentredString(page_width / 2, 10 * mm, f"- {page_num} -")
-    c.restoreState()
+def print_font_report(options, workers=1):
+    """输出字体加载耗时和嵌入 PDF 的字体子集大小"""
+    info = font_load_info.get((resolve_font_path(options.font_path), options.font_subset_ascii))
+    if info is None:
+        # 使用了缓存的 PDF，没有加载字体
+        return
+    source = "读取解析缓存" if info['cached'] else "解析字体文件"
+    if workers > 1:
+        size = "由子进程嵌入，未统计"
+    else:
+        size = f"{embedded_bytes() / 1024:.1f} KB"
+    print(f"字体加载: {info['seconds'] * 1000:.0f} ms ({source})，嵌入字体子集: {size}")
+
+def create_practice_pdf(char_list=None, output_path=None, stroke_manager=None, student=None, workers=None, use_cache=True):
+    """
+    生成练习 PDF（使用 config/settings.py 中的配置）
+    :param char_list: 要练习的汉字列表，默认使用 settings.CHAR_LIST
+    :param output_path: 输出文件路径，默认为 OUTPUT_DIR/OUTPUT_FILENAME
+    :param stroke_manager: 复用已有的 StrokeManager（由调用方负责关闭）
+    :param student: 学生姓名，显示在标题下方
+    :param workers: 分页并行渲染的进程数，默认使用 settings.RENDER_WORKERS
+    :param use_cache: 输入与之前某次完全相同时直接复制已生成的 PDF (见 settings.OUTPUT_CACHE_MAX_SIZE)
+    :return: 输出文件路径，失败时返回 None
+    """
+    if char_list is None:
+        char_list = settings.CHAR_LIST
 
-def create_practice_pdf():
     # 确保输出目录存在
     if not os.path.exists(settings.OUTPUT_DIR):
-        os.makedirs(settings.OUTPUT_DIR)
+        os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
         print(f"创建输出目录: {settings.OUTPUT_DIR}")
 
-    output_path = os.path.join(settings.OUTPUT_DIR, settings.OUTPUT_FILENAME)
+    if output_path is None:
+        output_path = os.path.join(settings.OUTPUT_DIR, settings.OUTPUT_FILENAME)
+    if workers is None:
+        workers = getattr(settings, 'RENDER_WORKERS', 1)
 
-    # 页面设置
-    c = canvas.Canvas(output_path, pagesize=A4)
-    c.setTitle("汉字书写练习")
-    
-    font_name = register_font()
-    if not font_name:
-        return
-
-    page_width, page_height = A4
-    
-    # 计算边距以居中
-    total_grid_width = settings.GRID_COUNT_PER_ROW * settings.GRID_SIZE
-    margin_x = (page_width - total_grid_width) / 2
-    
-    # 初始 Y 坐标 (顶部留出标题空间)
-    start_y = page_height - settings.HEADER_HEIGHT - settings.GRID_SIZE
-    current_y = start_y
-    
-    # 绘制第一页标题
-    draw_header(c, page_width, page_height, font_name)
-    
-    # 页码计数
-    page_num = 1
-    
-    # 初始化笔顺管理器
-    stroke_manager = None
-    if settings.SHOW_STROKE_ORDER:
-        stroke_manager = StrokeManager()
-
-    print(f"开始生成 PDF，共 {len(settings.CHAR_LIST)} 个字...")
-    
-    # 调整初始 Y 坐标，如果第一行有笔顺，需要预留空间
-    # 但为了简单，我们在循环里处理 Y 的移动
-    # 只是要注意第一页的 start_y 是否足够高？
-    # 原始 start_y = page_height - HEADER - GRID_SIZE
-    # 这意味着第一行格子的顶部是 page_height - HEADER
-    # 如果有笔顺，笔顺应该在格子上面。
-    # 所以我们需要把 start_y 下移？或者把笔顺画在 start_y 上面？
-    # 如果画在上面，会和 Header 重叠。
-    # 所以我们需要下移 start_y。
-    
-    if settings.SHOW_STROKE_ORDER:
-        # 为第一行的笔顺留出空间
-        start_y -= (settings.STROKE_ORDER_HEIGHT + settings.ROW_SPACING/2)
-        current_y = start_y
-
-    for index, char in enumerate(settings.CHAR_LIST):
-        # 检查是否需要换页
-        # 预估需要的空间：(笔顺行 + 间距) + (田字格行 + 间距)
-        # 注意：current_y 已经是当前行的底部（如果是笔顺行，就是笔顺行的底部？不对，current_y 应该是格子的底部）
-        
-        # 让我们统一逻辑：
-        # 每次循环，先检查空间。
-        # 需要的空间 = 格子高度 + (笔顺高度 if enabled) + 间距
-        
-        needed_space = settings.GRID_SIZE + settings.ROW_SPACING
-        if settings.SHOW_STROKE_ORDER:
-            needed_space += settings.STROKE_ORDER_HEIGHT + settings.ROW_SPACING/2
-            
-        if current_y < settings.BOTTOM_MARGIN:
-            # 绘制当前页页码
-            draw_page_number(c, page_num, page_width)
-            
-            c.showPage()
-            page_num += 1
-            
-            # 新页面不再绘制标题，使用较小的顶部边距
-            # 假设顶部边距与底部边距相同
-            top_margin = settings.BOTTOM_MARGIN
-            
-            # 重置 Y
-            current_y = page_height - top_margin - settings.GRID_SIZE
-            if settings.SHOW_STROKE_ORDER:
-                current_y -= (settings.STROKE_ORDER_HEIGHT + settings.ROW_SPACING/2)
-        
-        # 1. 绘制笔顺 (如果开启)
-        if settings.SHOW_STROKE_ORDER and stroke_manager:
-            # 笔顺画在格子上方
-            # 格子顶部 = current_y + GRID_SIZE
-            # 笔顺底部 = 格子顶部 + ROW_SPACING/2
-            stroke_y = current_y + settings.GRID_SIZE + settings.ROW_SPACING/4
-            # 绘制（传入字体用于显示组词）
-            stroke_manager.draw_stroke_order(c, char, margin_x, stroke_y, settings.STROKE_ORDER_HEIGHT, font_name)
-
-        # 2. 绘制田字格行
-        # 第一个字：黑色实体
-        draw_tian_grid(c, margin_x, current_y, settings.GRID_SIZE)
-        draw_char(c, char, margin_x, current_y, settings.GRID_SIZE, font_name, 'solid')
-        
-        # 描红字 (根据配置)
-        trace_count = getattr(settings, 'TRACE_COUNT', 4) # 默认4个
-        start_trace_idx = 1
-        # 计算结束索引，确保不超过每行总格子数
-        end_trace_idx = min(start_trace_idx + trace_count, settings.GRID_COUNT_PER_ROW)
-        
-        for i in range(start_trace_idx, end_trace_idx):
-            x = margin_x + i * settings.GRID_SIZE
-            draw_tian_grid(c, x, current_y, settings.GRID_SIZE)
-            draw_char(c, char, x, current_y, settings.GRID_SIZE, font_name, 'dashed')
-            
-        # 后面的：空白田字格
-        for i in range(end_trace_idx, settings.GRID_COUNT_PER_ROW):
-            x = margin_x + i * settings.GRID_SIZE
-            draw_tian_grid(c, x, current_y, settings.GRID_SIZE)
-            
-        # 移动到下一行
-        # 下移量 = 格子高度 + 间距 + (笔顺高度 + 间距 if enabled)
-        step = settings.GRID_SIZE + settings.ROW_SPACING
-        if settings.SHOW_STROKE_ORDER:
-            step += settings.STROKE_ORDER_HEIGHT + settings.ROW_SPACING/2
-            
-        current_y -= step
-        
-    # 最后一页页码
-    draw_page_number(c, page_num, page_width)
-    
-    c.save()
+    options = RenderOptions.from_settings(settings, student=student)
+    output_cache = OutputCache.from_settings(settings) if use_cache else None
+    context = RenderContext(stroke_manager, output_cache)
+    try:
+        if resolve_font_path(options.font_path) is None:
+            print("错误：未找到中文字体文件。请检查 config/settings.py 中的 FONT_PATH 设置。")
+            return
+
+        if options.show_stroke_order:
+            # 渲染前一次性并发查询所有缺失的组词
+            context.get_stroke_manager().prefetch_words(char_list)
+            startup.mark("初始化笔顺管理器")
+
+        print(f"开始生成 PDF，共 {len(char_list)} 个字...")
+        reset_embedded_bytes()
+        render(char_list, options, output_path, context, workers=workers)
+    finally:
+        metrics.add_counters(context.counters())
+        context.close()
+    if output_cache is not None and output_cache.hits:
+        print("输入没有变化，已直接使用缓存的 PDF。")
+    else:
+        print_font_report(options, workers)
     print(f"成功生成文件: {os.path.abspath(output_path)}")
+    return output_path
+
+def stream_practice_pdf(source, output_path=None, pages_per_file=None):
+    """
+    流式生成练习 PDF：逐块读取汉字，按分卷保存，适合数千字以上的长列表
+    :param source: 汉字文本文件路径，"-" 表示标准输入
+    :param pages_per_file: 每个分卷的页数，默认使用 settings.STREAM_PAGES_PER_FILE，0 表示不分卷
+    :return: 生成的文件路径列表
+    """
+    os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+    if output_path is None:
+        output_path = os.path.join(settings.OUTPUT_DIR, settings.OUTPUT_FILENAME)
+    if pages_per_file is None:
+        pages_per_file = getattr(settings, 'STREAM_PAGES_PER_FILE', 50)
+
+    options = RenderOptions.from_settings(settings)
+    context = RenderContext()
+    try:
+        paths = render_stream(iter_chars(source), options, output_path, context, pages_per_file=pages_per_file)
+    finally:
+        metrics.add_counters(context.counters())
+        context.close()
+    for path in paths:
+        print(f"成功生成文件: {os.path.abspath(path)}")
+    return paths
+
+def create_practice_images(fmt, char_list=None, output_path=None, dpi=None, workers=None, pages=None):
+    """
+    把练习纸的每一页直接生成为 SVG 或 PNG 图片 (版面与 PDF 相同)
+    :param fmt: "svg" 或 "png"
+    :param dpi: PNG 的分辨率，默认使用 settings.IMAGE_DPI
+    :param workers: 并行绘制的进程数，默认使用 settings.RENDER_WORKERS
+    :param pages: 只生成前几页 (如缩略图只需要第一页)，默认全部
+    :return: 生成的文件路径列表
+    """
+    from utils.page_image import render_images
+    if char_list is None:
+        char_list = settings.CHAR_LIST
+    os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+    if output_path is None:
+        output_path = os.path.join(settings.OUTPUT_DIR, settings.OUTPUT_FILENAME)
+    if dpi is None:
+        dpi = getattr(settings, 'IMAGE_DPI', 150)
+    if workers is None:
+        workers = getattr(settings, 'RENDER_WORKERS', 1)
+
+    options = RenderOptions.from_settings(settings)
+    if resolve_font_path(options.font_path) is None:
+        print("错误：未找到中文字体文件。请检查 config/settings.py 中的 FONT_PATH 设置。")
+        return []
+    context = RenderContext()
+    try:
+        print(f"开始生成 {fmt.upper()} 图片，共 {len(char_list)} 个字...")
+        paths = render_images(char_list, options, output_path, fmt, dpi, context, workers=workers,
+                              pages=range(1, pages + 1) if pages else None)
+    finally:
+        metrics.add_counters(context.counters())
+        context.close()
+    for path in paths:
+        print(f"成功生成文件: {os.path.abspath(path)}")
+    return paths
+
+def write_run_report(path, profiler=None):
+    """保存 JSON 运行报告：各阶段耗时、缓存命中和网络请求等计数、字体加载，以及可选的性能分析结果"""
+    extra = {
+        'fonts': [dict(info, seconds=round(info['seconds'], 6), path=font_path, ascii_readable=ascii_readable)
+                  for (font_path, ascii_readable), info in font_load_info.items()],
+        'embedded_font_bytes': embedded_bytes(),
+    }
+    if profiler is not None:
+        profile_file = os.path.splitext(path)[0] + '.prof' if profiler.cpu else None
+        extra['profile'] = profiler.result(profile_file)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    metrics.write_report(path, **extra)
+    print(f"运行报告已保存: {path}")
 
 if __name__ == "__main__":
-    create_practice_pdf()
+    parser = argparse.ArgumentParser(description="生成汉字田字格书写练习 PDF")
+    parser.add_argument('--startup-report', action='store_true', help="输出启动各阶段耗时和延迟导入的模块")
+    parser.add_argument('--batch', metavar='MANIFEST', help="批量生成：清单文件 (JSON 或 CSV)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="批量生成时的进程数 (默认 CPU 核数)；生成单份文档时为分页并行渲染的进程数 (默认 settings.RENDER_WORKERS)")
+    parser.add_argument('--stream', metavar='FILE', help="流式生成：从文本文件 (\"-\" 为标准输入) 逐块读取汉字，按分卷保存")
+    parser.add_argument('--pages-per-file', type=int, default=None, help="流式生成时每个分卷的页数 (默认 settings.STREAM_PAGES_PER_FILE，0 表示不分卷)")
+    parser.add_argument('--format', choices=('pdf', 'svg', 'png'), default='pdf',
+                        help="输出格式：svg / png 时每页生成一张图片 (PNG 需安装 Pillow)")
+    parser.add_argument('--dpi', type=int, default=None, help="PNG 的分辨率 (默认 settings.IMAGE_DPI)")
+    parser.add_argument('--pages', type=int, default=None, help="输出图片时只生成前 N 页 (如缩略图只需要第一页)")
+    parser.add_argument('--no-cache', action='store_true', help="忽略已缓存的 PDF，重新生成")
+    parser.add_argument('--dump-layout', action='store_true', help="只排版不绘制，以 JSON 输出每页的行和坐标")
+    parser.add_argument('--serve', action='store_true', help="以 HTTP 服务方式运行，常驻内存按请求生成 PDF")
+    parser.add_argument('--host', default=None, help="服务监听地址 (默认 settings.SERVER_HOST)")
+    parser.add_argument('--port', type=int, default=None, help="服务监听端口 (默认 settings.SERVER_PORT)")
+    parser.add_argument('--log-level', default='INFO', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                        help="日志级别 (默认 INFO；DEBUG 会逐字输出笔顺生成信息)")
+    parser.add_argument('--report', nargs='?', const='', default=None, metavar='FILE',
+                        help="保存 JSON 运行报告 (各阶段耗时、缓存命中、网络请求数、页数等)，默认 OUTPUT_DIR/run_report.json")
+    parser.add_argument('--profile', action='store_true', help="用 cProfile 记录函数耗时，写入运行报告和同名 .prof 文件")
+    parser.add_argument('--trace-memory', action='store_true', help="用 tracemalloc 记录内存峰值和主要分配位置 (运行会明显变慢)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(message)s')
+    report_path = args.report
+    if report_path == '' or (report_path is None and (args.profile or args.trace_memory)):
+        report_path = os.path.join(settings.OUTPUT_DIR, 'run_report.json')
+    with metrics.Profiler(cpu=args.profile, memory=args.trace_memory) as profiler:
+        if args.serve:
+            from utils.server import serve
+            serve(args.host, args.port)
+        elif args.batch:
+            from utils.batch import run_batch
+            run_batch(args.batch, workers=args.workers)
+        elif args.stream:
+            stream_practice_pdf(args.stream, pages_per_file=args.pages_per_file)
+        elif args.dump_layout:
+            import json
+            from utils.layout import layout, plan_to_dict
+            pages = layout(settings.CHAR_LIST, RenderOptions.from_settings(settings))
+            print(json.dumps(plan_to_dict(pages), ensure_ascii=False, indent=1))
+        elif args.format != 'pdf':
+            create_practice_images(args.format, dpi=args.dpi, workers=args.workers, pages=args.pages)
+        else:
+            create_practice_pdf(workers=args.workers, use_cache=not args.no_cache)
+    startup.mark("生成完成")
+    if report_path:
+        write_run_report(report_path, profiler)
+    if args.startup_report:
+        startup.report()
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reportlab import rl_config
+
+from config import settings
+from benchmarks.fixtures import generate_graphics, stub_font_path, WordApiStub
+
+# 测试使用 benchmarks/fixtures.py 中的合成笔顺数据、替身字体和本地组词接口，不访问网络，也不读写项目的 data 目录
+
+# 合成数据中的汉字数
+FIXTURE_CHAR_COUNT = 2000
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    """包含合成 graphics.txt 的数据目录 (笔顺索引、组词缓存也写在这里)"""
+    path = tmp_path_factory.mktemp('data')
+    generate_graphics(str(path / 'graphics.txt'), FIXTURE_CHAR_COUNT)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def font_path():
+    return stub_font_path()
+
+
+@pytest.fixture(autouse=True)
+def word_api(monkeypatch):
+    """组词查询指向本地替身接口 (不限流)"""
+    with WordApiStub() as api:
+        monkeypatch.setattr(settings, 'WORDS_API_URL', api.url, raising=False)
+        monkeypatch.setattr(settings, 'WORDS_API_RATE', 1000, raising=False)
+        yield api
+
+
+@pytest.fixture
+def invariant():
+    """固定 PDF 中的时间戳和文档 ID，使相同输入生成完全相同的字节"""
+    previous = rl_config.invariant
+    rl_config.invariant = 1
+    yield
+    rl_config.invariant = previous
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from reportlab.lib import colors
+
+from benchmarks.fixtures import fixture_chars
+from utils.render import RenderOptions, RenderContext, render
+from utils.stroke_manager import StrokeManager
+
+
+def _variants(font_path):
+    base = RenderOptions(font_path=font_path, date_text="2024年1月1日")
+    return [
+        base,
+        base.replace(trace_count=2, student="张三"),
+        base.replace(grid_color=colors.green, grid_count_per_row=8),
+        base.replace(show_stroke_order=False, title="无笔顺"),
+        base.replace(char_centering="legacy", text_color_dashed=colors.Color(0.5, 0.5, 0.9)),
+    ]
+
+
+def test_concurrent_render_matches_sequential(data_dir, font_path, invariant):
+    """多个线程共用一个 RenderContext 同时渲染不同选项，结果与逐个渲染完全相同"""
+    chars = fixture_chars(60)
+    variants = _variants(font_path)
+    stroke_manager = StrokeManager(data_dir=data_dir)
+    context = RenderContext(stroke_manager)
+    try:
+        expected = [render(chars, options, context=context) for options in variants]
+        assert len(set(expected)) == len(variants)
+
+        jobs = variants * 4
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda options: render(chars, options, context=context), jobs))
+    finally:
+        context.close()
+        stroke_manager.close()
+
+    assert results == expected * 4
@@ -0,0 +1,192 @@
+import os
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from utils import download
+from utils.download import download_file, DownloadError
+
+CONTENT = bytes(range(256)) * 4096
+# 断开连接前发送的字节数 (大于 download.CHUNK_SIZE，断开前已有数据写入 .part)
+CUT_AT = 300000
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, status, length, content_range=None):
+        server = self.server
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        if content_range:
+            self.send_header('Content-Range', content_range)
+        if server.etag:
+            self.send_header('ETag', server.etag)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers(200, len(self.server.data))
+
+    def do_GET(self):
+        server = self.server
+        data = server.data
+        server.requests.append({'range': self.headers.get('Range'), 'if_range': self.headers.get('If-Range')})
+        start = 0
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and server.ranges and (if_range is None or if_range == server.etag):
+            start = int(range_header.split('=', 1)[1].split('-', 1)[0])
+            if start >= len(data):
+                self._send_headers(416, 0, f'bytes */{len(data)}')
+                return
+            start += server.bad_start
+            self._send_headers(206, len(data) - start, f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            self._send_headers(200, len(data))
+        body = data[start:]
+        if server.cuts > 0:
+            # 只发送一部分后断开连接
+            server.cuts -= 1
+            self.wfile.write(body[:CUT_AT])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class RangeServer:
+    """支持 Range / If-Range 的本地下载服务器替身，在后台线程中运行"""
+
+    def __init__(self, data=CONTENT, etag='"v1"', ranges=True, cuts=0, bad_start=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.data = data
+        self.httpd.etag = etag
+        self.httpd.ranges = ranges
+        self.httpd.cuts = cuts
+        self.httpd.bad_start = bad_start
+        self.httpd.requests = []
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/graphics.txt"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_wait(monkeypatch):
+    """重试前不等待"""
+    monkeypatch.setattr(download.time, 'sleep', lambda seconds: None)
+
+
+@pytest.fixture
+def dest(tmp_path):
+    return str(tmp_path / 'graphics.txt')
+
+
+def _write_part(dest, data, validator=None):
+    with open(dest + '.part', 'wb') as f:
+        f.write(data)
+    if validator:
+        with open(dest + '.part.validator', 'w', encoding='utf-8') as f:
+            f.write(validator)
+
+
+def _check_result(dest, data=CONTENT):
+    with open(dest, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(dest + '.part')
+    assert not os.path.exists(dest + '.part.validator')
+
+
+def test_plain_download(dest):
+    received = bytearray()
+    with RangeServer() as server:
+        digest = download_file(server.url, dest, on_data=lambda offset, chunk: received.extend(chunk))
+    assert digest == hashlib.sha256(CONTENT).hexdigest()
+    assert bytes(received) == CONTENT
+    assert server.requests == [{'range': None, 'if_range': None}]
+    _check_result(dest)
+
+
+def test_resume_after_cut_connection(dest):
+    """连接中断后带 Range 和 If-Range 从断点继续，on_data 收到完整的字节"""
+    chunks = []
+    with RangeServer(cuts=1) as server:
+        download_file(server.url, dest, retries=1, on_data=lambda offset, chunk: chunks.append((offset, chunk)))
+    resumed = server.requests[1]
+    assert resumed['if_range'] == '"v1"'
+    assert 0 < int(resumed['range'][len('bytes='):-1]) <= CUT_AT
+    # 第二次尝试从 offset=0 开始回放已下载的部分
+    last = max(i for i, (offset, _) in enumerate(chunks) if offset == 0)
+    assert b''.join(chunk for _, chunk in chunks[last:]) == CONTENT
+    _check_result(dest)
+
+
+def test_server_without_range_support(dest):
+    _write_part(dest, CONTENT[:CUT_AT])
+    with RangeServer(ranges=False) as server:
+        download_file(server.url, dest)
+    assert server.requests[0]['range'] == f'bytes={CUT_AT}-'
+    _check_result(dest)
+
+
+def test_mismatched_partial_response_restarts(dest):
+    """206 的起始位置与请求不符时删除 .part，从头下载"""
+    _write_part(dest, CONTENT[:CUT_AT])
+    with RangeServer(bad_start=100) as server:
+        download_file(server.url, dest)
+    assert [request['range'] for request in server.requests] == [f'bytes={CUT_AT}-', None]
+    _check_result(dest)
+
+
+def test_complete_part_accepted_on_416(dest):
+    _write_part(dest, CONTENT, '"v1"')
+    with RangeServer() as server:
+        digest = download_file(server.url, dest)
+    assert digest == hashlib.sha256(CONTENT).hexdigest()
+    assert len(server.requests) == 1
+    _check_result(dest)
+
+
+def test_oversized_part_restarts_on_416(dest):
+    """.part 比服务器上的文件还大时不能当作下载完成"""
+    _write_part(dest, CONTENT + b'extra')
+    with RangeServer() as server:
+        download_file(server.url, dest)
+    assert [request['range'] for request in server.requests] == [f'bytes={len(CONTENT) + 5}-', None]
+    _check_result(dest)
+
+
+def test_updated_file_is_not_joined_to_old_part(dest):
+    """服务器上的文件已更新 (ETag 不同) 时重新下载，不把旧的 .part 与新文件拼在一起"""
+    new_content = CONTENT[::-1]
+    _write_part(dest, CONTENT[:CUT_AT], '"v1"')
+    with RangeServer(data=new_content, etag='"v2"') as server:
+        digest = download_file(server.url, dest)
+    assert server.requests == [{'range': f'bytes={CUT_AT}-', 'if_range': '"v1"'}]
+    assert digest == hashlib.sha256(new_content).hexdigest()
+    _check_result(dest, new_content)
+
+
+def test_bad_sha256(dest):
+    with RangeServer() as server:
+        with pytest.raises(DownloadError):
+            download_file(server.url, dest, sha256='0' * 64)
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + '.part')
@@ -0,0 +1,35 @@
+from benchmarks.fixtures import fixture_chars, generate_graphics
+from utils.output_cache import OutputCache
+from utils.render import RenderOptions, RenderContext, render
+from utils.stroke_manager import StrokeManager
+
+# 合成数据中的汉字数；CHARS 末尾的汉字没有笔顺数据
+DATA_CHAR_COUNT = 20
+CHARS = fixture_chars(5) + list("，。ABC!?") + fixture_chars(DATA_CHAR_COUNT + 3)[DATA_CHAR_COUNT:]
+
+
+def _render_requests(word_api, data_dir, font_path, output_cache=None):
+    """用新的数据目录渲染一次，返回期间组词接口收到的请求数"""
+    data_dir.mkdir()
+    generate_graphics(str(data_dir / 'graphics.txt'), DATA_CHAR_COUNT)
+    stroke_manager = StrokeManager(data_dir=str(data_dir))
+    context = RenderContext(stroke_manager, output_cache=output_cache)
+    options = RenderOptions(font_path=font_path, date_text="2024年1月1日")
+    before = word_api.requests
+    try:
+        render(CHARS, options, context=context)
+    finally:
+        context.close()
+        stroke_manager.close()
+    return word_api.requests - before
+
+
+def test_output_cache_does_not_query_words(word_api, font_path, tmp_path):
+    """计算生成结果的缓存键时不在线查询组词 (没有笔顺数据的字也不查询)"""
+    uncached = _render_requests(word_api, tmp_path / 'a', font_path)
+    cache = OutputCache(str(tmp_path / 'cache'), 50 * 1024 * 1024)
+    cached = _render_requests(word_api, tmp_path / 'b', font_path, cache)
+
+    assert uncached == 5
+    assert cached <= uncached
+    assert cache.misses == 1
@@ -0,0 +1,45 @@
+import pytest
+
+from config import settings
+from utils.server import WorksheetService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, 'OUTPUT_CACHE_MAX_SIZE', 0, raising=False)
+    service = WorksheetService(max_chars=10)
+    yield service
+    service.close()
+
+
+@pytest.mark.parametrize('params', [
+    {'chars': '前', 'page_size': 'abc'},
+    {'chars': '前', 'font_path': '/etc/passwd'},
+    {'chars': '前', 'grid_count_per_row': '1000000'},
+    {'chars': '前', 'grid_count_per_row': 'abc'},
+    {'chars': '前', 'grid_size': '0.1'},
+    {'chars': '前', 'trace_count': '-1'},
+    {'chars': '前', 'grid_color': 'xyz'},
+    {'chars': '前', 'char_centering': 'middle'},
+    {'chars': '前', 'options': {'grid_size': 'nan'}},
+    {'chars': '前', 'options': {'grid_count_per_row': [1]}},
+    {'chars': '前', 'options': {'show_stroke_order': 1}},
+    {'chars': '前', 'student': 123},
+])
+def test_invalid_options_are_rejected(service, params):
+    """不合法或超出范围的选项抛出 ValueError (HTTP 接口返回 400)"""
+    with pytest.raises(ValueError):
+        service.parse_request(params)
+
+
+def test_valid_options_are_converted(service):
+    chars, options = service.parse_request({
+        'chars': '前后', 'student': '张三', 'grid_count_per_row': '8',
+        'options': {'trace_count': 2, 'grid_size': 40, 'show_stroke_order': False},
+    })
+    assert chars == ['前', '后']
+    assert options.student == '张三'
+    assert options.grid_count_per_row == 8
+    assert options.trace_count == 2
+    assert options.grid_size == 40.0 and isinstance(options.grid_size, float)
+    assert options.show_stroke_order is False
@@ -0,0 +1,64 @@
+import os
+import sys
+import itertools
+import multiprocessing
+
+import pytest
+
+resource = pytest.importorskip('resource')
+
+from benchmarks.fixtures import fixture_chars
+
+# 流式生成的内存上限：10000 字的峰值 RSS 与 1000 字相比的增量，以及绝对上限 (MB)
+MAX_GROWTH_MB = 30
+MAX_RSS_MB = 400
+PAGES_PER_FILE = 50
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _stream_in_child(data_dir, font_path, api_url, count, output_path, queue):
+    """在新进程中流式生成 count 个字，返回 (分卷数, 峰值 RSS)"""
+    from config import settings
+    settings.WORDS_API_URL = api_url
+    settings.WORDS_API_RATE = 1000
+    from utils.render import RenderOptions, RenderContext, render_stream
+    from utils.stroke_manager import StrokeManager
+
+    options = RenderOptions(font_path=font_path, date_text="2024年1月1日")
+    # 循环使用合成数据中的字，字数超过内存中保留的笔顺数 (STROKE_MEMORY_CACHE_SIZE)
+    chars = itertools.islice(itertools.cycle(fixture_chars(2000)), count)
+    stroke_manager = StrokeManager(data_dir=data_dir)
+    context = RenderContext(stroke_manager)
+    try:
+        paths = render_stream(chars, options, output_path, context, pages_per_file=PAGES_PER_FILE)
+    finally:
+        context.close()
+        stroke_manager.close()
+    queue.put((len(paths), _peak_rss_mb()))
+
+
+def _run(data_dir, font_path, api_url, count, output_path):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_stream_in_child, args=(data_dir, font_path, api_url, count, output_path, queue))
+    process.start()
+    result = queue.get(timeout=900)
+    process.join()
+    assert process.exitcode == 0
+    return result
+
+
+def test_stream_memory_is_flat(data_dir, font_path, word_api, tmp_path):
+    """流式生成 10000 字时的峰值内存与 1000 字基本相同"""
+    _, small_rss = _run(data_dir, font_path, word_api.url, 1000, str(tmp_path / 'small.pdf'))
+    files, large_rss = _run(data_dir, font_path, word_api.url, 10000, str(tmp_path / 'large.pdf'))
+
+    assert files > 1
+    assert all(os.path.exists(tmp_path / f"large_{n:03d}.pdf") for n in range(1, files + 1))
+    assert large_rss - small_rss < MAX_GROWTH_MB, (small_rss, large_rss)
+    assert large_rss < MAX_RSS_MB
@@ -0,0 +1,136 @@
+import os
+import csv
+import json
+import time
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+
+from config import settings
+from utils.output_cache import OutputCache
+from utils.render import RenderOptions, RenderContext, render, build_options
+
+# 每个工作进程初始化一次的共享对象
+_worker = {}
+
+
+def load_manifest(path):
+    """
+    读取批量生成清单，返回任务列表
+    JSON: [{"student": "张三", "chars": "前后上下", "output": "张三.pdf", "options": {"TRACE_COUNT": 3}}, ...]
+    CSV:  表头包含 student, chars, output，其余列作为选项
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        jobs = []
+        for row in rows:
+            job = {key: row.pop(key, None) for key in ('student', 'chars', 'output')}
+            job['options'] = {key: value for key, value in row.items() if key and value not in (None, '')}
+            jobs.append(job)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        jobs = data['jobs'] if isinstance(data, dict) else data
+
+    result = []
+    for i, job in enumerate(jobs, 1):
+        chars = job.get('chars') or ''
+        if isinstance(chars, str):
+            chars = [c for c in chars if c.strip()]
+        student = job.get('student') or None
+        output = job.get('output') or f"{student or f'sheet_{i}'}.pdf"
+        result.append({
+            'student': student,
+            'chars': chars,
+            'output': output,
+            'options': dict(job.get('options') or {}),
+        })
+    return result
+
+
+def _init_worker():
+    """工作进程初始化：注册字体、打开笔顺数据，之后所有任务共用"""
+    context = RenderContext(output_cache=OutputCache.from_settings(settings))
+    base = RenderOptions.from_settings(settings)
+    context.register_font(base.font_path, base.font_subset_ascii)
+    # 进程退出时写回缓存
+    multiprocessing.util.Finalize(context, context.close, exitpriority=10)
+    _worker['context'] = context
+    _worker['base'] = base
+
+
+def _run_job(job):
+    """在工作进程中生成一份练习纸，返回 (输出路径, 耗时秒数)"""
+    if not _worker:
+        _init_worker()
+    context = _worker['context']
+
+    output_path = job['output']
+    if not os.path.isabs(output_path):
+        output_path = os.path.join(settings.OUTPUT_DIR, output_path)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    options = build_options(_worker['base'], job['options'], job['student'])
+    start = time.perf_counter()
+    render(job['chars'], options, output_path, context)
+    if options.show_stroke_order:
+        context.get_stroke_manager().flush()
+    return output_path, time.perf_counter() - start
+
+
+def run_batch(manifest_path, workers=None):
+    """按清单并行生成多份练习纸，返回成功生成的文件列表"""
+    jobs = load_manifest(manifest_path)
+    if not jobs:
+        print("清单中没有任务。")
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    print(f"批量生成 {len(jobs)} 份练习纸，进程数: {workers}")
+
+    start = time.perf_counter()
+
+    # 先在主进程里准备好共享资源：建立笔顺索引、统一查询所有缺失的组词、注册字体
+    # (fork 方式启动的工作进程会直接继承已解析的字体)
+    context = RenderContext()
+    base = RenderOptions.from_settings(settings)
+    context.register_font(base.font_path, base.font_subset_ascii)
+    stroke_manager = context.get_stroke_manager()
+    stroke_manager.preload()
+    stroke_manager.prefetch_words(c for job in jobs for c in job['chars'])
+    context.close()
+
+    results = []
+    failed = 0
+    if workers == 1:
+        outcomes = map(_safe_run_job, jobs)
+        for job, outcome in zip(jobs, outcomes):
+            failed += _collect(job, outcome, results)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for job, outcome in zip(jobs, pool.map(_safe_run_job, jobs)):
+                failed += _collect(job, outcome, results)
+
+    elapsed = time.perf_counter() - start
+    print(f"批量生成完成: 成功 {len(results)} 份，失败 {failed} 份，"
+          f"耗时 {elapsed:.2f} 秒，{len(results) / elapsed:.2f} 份/秒")
+    return results
+
+
+def _safe_run_job(job):
+    """捕获单个任务的异常，避免一个任务失败中断整个批次"""
+    try:
+        return _run_job(job), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _collect(job, outcome, results):
+    result, error = outcome
+    name = job['student'] or job['output']
+    if error or not result or not result[0]:
+        print(f"[失败] {name}: {error or '生成失败'}")
+        return 1
+    path, cost = result
+    print(f"[完成] {name}: {path} ({cost:.2f} 秒)")
+    results.append(path)
+    return 0
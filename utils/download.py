@@ -0,0 +1,226 @@
+import os
+import time
+import hashlib
+import logging
+
+from utils.startup import lazy_import
+
+logger = logging.getLogger(__name__)
+
+# 分块大小，整个文件不会一次读入内存
+CHUNK_SIZE = 1 << 16
+# 每下载这么多字节输出一次进度
+PROGRESS_INTERVAL = 5 * 1024 * 1024
+
+
+class DownloadError(Exception):
+    """下载失败且不能续传 (如校验不一致)"""
+
+
+class IncompleteDownload(DownloadError):
+    """连接提前结束，已下载的部分保留在 .part 文件中，可以续传"""
+
+
+def _content_range_start(value):
+    """从 "bytes 100-999/1000" 中取出起始位置"""
+    try:
+        unit, spec = value.split(' ', 1)
+        return int(spec.split('-', 1)[0]) if unit == 'bytes' else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def _expected_size(response):
+    """响应对应的完整文件大小，未知时返回 None"""
+    content_range = response.headers.get('Content-Range')
+    if content_range:
+        total = content_range.rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def _remote_size(session, url, proxies, timeout):
+    """用 HEAD 请求查询文件大小，未知时返回 None"""
+    try:
+        response = session.head(url, headers={'Accept-Encoding': 'identity'}, proxies=proxies,
+                                timeout=timeout, allow_redirects=True)
+    except Exception as e:
+        logger.debug("HEAD 请求失败: %s", e)
+        return None
+    if response.status_code != 200:
+        return None
+    return _expected_size(response)
+
+
+def _validator(response):
+    """响应中可用于 If-Range 的校验值 (强 ETag，没有时用 Last-Modified)，都没有时返回 None"""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def _validator_file(part_file):
+    """保存 .part 对应的服务器文件版本 (ETag 或 Last-Modified)，续传时用 If-Range 确认文件没有更新"""
+    return part_file + '.validator'
+
+
+def _load_validator(part_file):
+    try:
+        with open(_validator_file(part_file), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _save_validator(part_file, validator):
+    if validator:
+        with open(_validator_file(part_file), 'w', encoding='utf-8') as f:
+            f.write(validator)
+    else:
+        _remove_validator(part_file)
+
+
+def _remove_validator(part_file):
+    try:
+        os.remove(_validator_file(part_file))
+    except FileNotFoundError:
+        pass
+
+
+def _replay(part_file, digest, on_data):
+    """续传前把已下载的部分重新计入校验和，并回放给 on_data"""
+    offset = 0
+    with open(part_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            if on_data:
+                on_data(offset, chunk)
+            offset += len(chunk)
+    return offset
+
+
+def _discard(part_file, reason):
+    """.part 与服务器上的文件对不上，删除后从头下载"""
+    logger.warning(f"{reason}，删除已下载的部分并重新下载。")
+    os.remove(part_file)
+    _remove_validator(part_file)
+
+
+def _download_once(session, url, part_file, proxies, timeout, on_data):
+    """一次下载尝试 (从 .part 的末尾续传)，返回 (SHA-256, 文件大小)"""
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    while True:
+        # 不接受压缩编码，保证 Range 和 Content-Length 都以文件字节计
+        headers = {'Accept-Encoding': 'identity'}
+        validator = _load_validator(part_file) if offset else None
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            # 服务器上的文件已更新时，服务器会忽略 Range 返回完整文件 (200)，不会把新旧两个版本拼在一起
+            # 第一次下载时服务器没有返回 ETag / Last-Modified 的，只能按长度续传
+            if validator:
+                headers['If-Range'] = validator
+
+        with session.get(url, headers=headers, proxies=proxies, timeout=timeout, stream=True) as response:
+            if offset and response.status_code == 416:
+                # 请求的范围超出文件末尾：只有确认文件大小正好等于 .part 时才算已经下载完整
+                content_range = response.headers.get('Content-Range')
+                total = _expected_size(response) if content_range else _remote_size(session, url, proxies, timeout)
+                if total != offset:
+                    _discard(part_file, f"已下载 {offset} 字节，但服务器上的文件大小为 {total}")
+                    offset = 0
+                    continue
+                mode = None
+            elif offset and response.status_code == 206:
+                start = _content_range_start(response.headers.get('Content-Range'))
+                if start != offset:
+                    _discard(part_file, f"请求从 {offset} 字节续传，服务器却从 {start} 字节开始返回")
+                    offset = 0
+                    continue
+                current = _validator(response)
+                if validator and current and current != validator:
+                    _discard(part_file, "服务器上的文件已更新")
+                    offset = 0
+                    continue
+                logger.info(f"从 {offset / 1024 / 1024:.1f} MB 处继续下载...")
+                mode = 'ab'
+                total = _expected_size(response)
+            else:
+                response.raise_for_status()
+                if offset:
+                    if validator:
+                        logger.info("服务器上的文件已更新或不支持断点续传，重新下载。")
+                    else:
+                        logger.info("服务器不支持断点续传，重新下载。")
+                offset = 0
+                _save_validator(part_file, _validator(response))
+                mode = 'wb'
+                total = _expected_size(response)
+
+            digest = hashlib.sha256()
+            size = _replay(part_file, digest, on_data) if offset else 0
+            if mode is not None:
+                next_report = size + PROGRESS_INTERVAL
+                with open(part_file, mode) as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        if on_data:
+                            on_data(size, chunk)
+                        size += len(chunk)
+                        if size >= next_report:
+                            progress = f" / {total / 1024 / 1024:.1f}" if total else ""
+                            logger.info(f"已下载 {size / 1024 / 1024:.1f}{progress} MB")
+                            next_report = size + PROGRESS_INTERVAL
+        break
+
+    if total is not None and size != total:
+        raise IncompleteDownload(f"只收到 {size} / {total} 字节")
+    return digest.hexdigest(), size
+
+
+def download_file(url, dest, sha256=None, proxies=None, timeout=(10, 60), retries=3, on_data=None, session=None):
+    """
+    分块流式下载 url 到 dest：先写入 dest + ".part"，校验通过后原子重命名
+    连接中断时保留 .part，本次自动重试或下次调用时用 HTTP Range 从断点继续；
+    服务器返回了 ETag 或 Last-Modified 时，续传请求带上 If-Range，文件已更新则重新下载
+    :param sha256: 期望的 SHA-256 (十六进制)；为 None 时只检查长度，并在日志中输出实际的 SHA-256
+    :param timeout: (连接超时, 读取超时) 秒
+    :param retries: 连接中断后的自动续传次数
+    :param on_data: on_data(offset, chunk)，按顺序接收文件的全部字节，可用于边下载边建索引；
+                    每次尝试都从 offset=0 开始 (续传时先回放已下载的部分)，收到 offset=0 时应重新开始
+    :param session: requests.Session，默认临时创建
+    :return: 文件的 SHA-256
+    """
+    requests = lazy_import('requests')
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    part_file = dest + '.part'
+    owns_session = session is None
+    if owns_session:
+        session = requests.Session()
+    retryable = (requests.ConnectionError, requests.Timeout,
+                 requests.exceptions.ChunkedEncodingError, IncompleteDownload)
+    start = time.perf_counter()
+    try:
+        for attempt in range(retries + 1):
+            try:
+                digest, size = _download_once(session, url, part_file, proxies, timeout, on_data)
+                break
+            except retryable as e:
+                if attempt == retries:
+                    raise IncompleteDownload(f"{e} (已下载的部分保存在 {part_file}，再次运行会继续下载)") from e
+                wait = min(2 ** attempt, 10)
+                logger.warning(f"下载中断 ({e})，{wait} 秒后从断点继续...")
+                time.sleep(wait)
+    finally:
+        if owns_session:
+            session.close()
+
+    _remove_validator(part_file)
+    if sha256 and digest != sha256.lower():
+        os.remove(part_file)
+        raise DownloadError(f"校验失败: SHA-256 为 {digest}，应为 {sha256}")
+    os.replace(part_file, dest)
+    logger.info(f"下载完成: {size / 1024 / 1024:.1f} MB，耗时 {time.perf_counter() - start:.1f} 秒 (SHA-256: {digest})")
+    return digest
@@ -0,0 +1,127 @@
+import os
+import logging
+import time
+import pickle
+import hashlib
+import threading
+from fnmatch import fnmatch
+from weakref import WeakKeyDictionary
+
+from reportlab import Version as REPORTLAB_VERSION
+from reportlab.pdfbase import ttfonts
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace, TTEncoding
+
+logger = logging.getLogger(__name__)
+
+# 解析 TTF (cmap、hmtx、loca 等表) 的结果缓存到磁盘，之后直接加载，不再逐表解析
+# 键为 (路径, 大小, 修改时间, ReportLab 版本)；字体文件本身仍从原路径读取，用于生成子集
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '.font_cache')
+
+# 缓存格式版本：保存的字段变化时加 1
+CACHE_VERSION = 1
+
+# 不保存的字段：文件内容 (加载时重新读取)、无法序列化的缩放函数 (按 unitsPerEm 重建)
+_TRANSIENT = ('_ttf_data', '_pdfScale')
+
+# 当前线程生成的字体子集字节数 (保存 PDF 时在同一线程内生成子集)
+_embedded = threading.local()
+
+
+def reset_embedded_bytes():
+    _embedded.bytes = 0
+
+
+def embedded_bytes():
+    """自上次 reset_embedded_bytes 以来，当前线程嵌入的字体子集字节数 (压缩前)"""
+    return getattr(_embedded, 'bytes', 0)
+
+
+class SubsetCountingFace(TTFontFace):
+    """记录嵌入字节数的 TrueType 字体"""
+
+    def makeSubset(self, subset):
+        data = TTFontFace.makeSubset(self, subset)
+        _embedded.bytes = embedded_bytes() + len(data)
+        return data
+
+
+def _scale_function(units_per_em):
+    """与 TTFontFile.extractInfo 中相同的字体单位 -> 1000 单位换算"""
+    if units_per_em == 1000:
+        return lambda x: x
+    factor = 1000 / units_per_em
+    return lambda x: x * factor
+
+
+def _cache_file(cache_dir, path, st):
+    key = f"{CACHE_VERSION}|{REPORTLAB_VERSION}|{path}|{st.st_size}|{st.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{digest[:16]}.pickle")
+
+
+def _load_cached_face(cache_file, path):
+    with open(cache_file, 'rb') as f:
+        state = pickle.load(f)
+    face = SubsetCountingFace.__new__(SubsetCountingFace)
+    face.__dict__.update(state)
+    with open(path, 'rb') as f:
+        face._ttf_data = f.read()
+    face._pdfScale = _scale_function(face.unitsPerEm)
+    return face
+
+
+def _save_face(cache_file, face):
+    state = {key: value for key, value in face.__dict__.items() if key not in _TRANSIENT}
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def load_face(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    加载字体，优先使用解析缓存
+    :param cache_dir: 缓存目录，为 None 时不使用缓存
+    :return: (face, 是否来自缓存)
+    """
+    if cache_dir:
+        st = os.stat(path)
+        cache_file = _cache_file(cache_dir, path, st)
+        if os.path.exists(cache_file):
+            try:
+                return _load_cached_face(cache_file, path), True
+            except Exception as e:
+                logger.warning(f"字体缓存损坏，重新解析: {e}")
+
+    face = SubsetCountingFace(path)
+    if cache_dir:
+        try:
+            _save_face(cache_file, face)
+        except Exception as e:
+            logger.warning(f"保存字体缓存失败: {e}")
+    return face, False
+
+
+def make_ttfont(name, path, ascii_readable=False, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    创建 TTFont (同 TTFont(name, path)，但使用解析缓存)
+    :param ascii_readable: 为 True 时第一个子集固定包含全部 ASCII 字符 (ReportLab 默认)；
+                           为 False 时只嵌入文档中实际用到的字符
+    :return: (font, 加载耗时秒数, 是否来自缓存)
+    """
+    start = time.perf_counter()
+    face, cached = load_face(path, cache_dir)
+
+    # 与 TTFont.__init__ 相同的初始化，只是 face 由上面加载
+    # 注意：必须与所用 ReportLab 版本的 TTFont.__init__ 保持一致，升级 ReportLab 时需要核对
+    font = TTFont.__new__(TTFont)
+    font.fontName = name
+    font.face = face
+    font.encoding = TTEncoding()
+    font.state = WeakKeyDictionary()
+    font._asciiReadable = ascii_readable
+    # 名称匹配 ReportLab 的 unShapedFontGlob 的字体不做文字塑形 (旧版 ReportLab 没有该配置)
+    font.shapable = not any(fnmatch(name, glob) for glob in getattr(ttfonts, 'unShapedFontGlob', ()))
+    return font, time.perf_counter() - start, cached
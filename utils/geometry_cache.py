@@ -0,0 +1,107 @@
+import os
+import time
+import marshal
+import sqlite3
+
+# 缓存格式版本：几何数据的生成方式变化时加 1，旧缓存会被整体丢弃
+CACHE_VERSION = 2
+
+
+class GeometryCache:
+    """
+    笔顺几何数据的持久化缓存 (SQLite)
+    键: (汉字, 尺寸, 数据文件哈希)；值: 每个笔画已缩放好的 (points, operators)
+    超出容量上限时按最近使用时间淘汰 (LRU)
+    """
+
+    def __init__(self, cache_file, data_hash, max_bytes):
+        self.cache_file = cache_file
+        self.data_hash = data_hash
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._total_bytes = 0
+        # 命中的键，关闭时统一更新使用时间，避免每次命中都写库
+        self._touched = set()
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_file, timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != CACHE_VERSION:
+            self._conn.execute('DROP TABLE IF EXISTS geometry')
+            self._conn.execute(f'PRAGMA user_version={CACHE_VERSION}')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS geometry ('
+            ' char TEXT NOT NULL, size TEXT NOT NULL, data_hash TEXT NOT NULL,'
+            ' data BLOB NOT NULL, nbytes INTEGER NOT NULL, last_used REAL NOT NULL,'
+            ' PRIMARY KEY (char, size, data_hash))'
+        )
+        # graphics.txt 变化后，旧数据全部失效
+        self._conn.execute('DELETE FROM geometry WHERE data_hash != ?', (self.data_hash,))
+        self._conn.commit()
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM geometry').fetchone()[0]
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            if self._touched:
+                now = time.time()
+                self._conn.executemany(
+                    'UPDATE geometry SET last_used = ? WHERE char = ? AND size = ? AND data_hash = ?',
+                    [(now, char, size, self.data_hash) for char, size in self._touched]
+                )
+                self._conn.commit()
+        finally:
+            self._touched.clear()
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _size_key(size):
+        return f"{size:.4f}"
+
+    def get(self, char, size):
+        """返回 [(points, operators), ...]，未命中返回 None"""
+        if self._conn is None:
+            return None
+        key = self._size_key(size)
+        row = self._conn.execute(
+            'SELECT data FROM geometry WHERE char = ? AND size = ? AND data_hash = ?',
+            (char, key, self.data_hash)
+        ).fetchone()
+        if row is None:
+            return None
+        self._touched.add((char, key))
+        return marshal.loads(row[0])
+
+    def put(self, char, size, strokes):
+        """保存一个汉字的笔画几何数据"""
+        if self._conn is None:
+            return
+        data = marshal.dumps([(list(points), list(operators)) for points, operators in strokes])
+        self._conn.execute(
+            'INSERT OR REPLACE INTO geometry (char, size, data_hash, data, nbytes, last_used)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (char, self._size_key(size), self.data_hash, data, len(data), time.time())
+        )
+        self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        """按最近使用时间淘汰，直到总大小降到上限的 90% 以下"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute('SELECT rowid, nbytes FROM geometry ORDER BY last_used').fetchall()
+        total = sum(nbytes for _, nbytes in rows)
+        evicted = []
+        for rowid, nbytes in rows:
+            if total <= target:
+                break
+            evicted.append((rowid,))
+            total -= nbytes
+        self._conn.executemany('DELETE FROM geometry WHERE rowid = ?', evicted)
+        self._total_bytes = total
@@ -0,0 +1,99 @@
+import struct
+import threading
+
+from reportlab.pdfbase import pdfmetrics
+
+# 字形度量：从 TrueType 的 glyf 表读取每个字形的实际边界，按边界把字放在格子正中
+# 每种字体、字号只建一张表，表中只包含文档里实际出现的字 (第一次用到时读取)
+
+# glyf 表中每个字形的头部: 轮廓数, xMin, yMin, xMax, yMax (字体单位)
+_GLYPH_HEADER = struct.Struct('>hhhhh')
+
+# 旧版估算：字号占格子的 85%，基线在格子底部向上 15% 字号处
+FONT_SIZE_RATIO = 0.85
+LEGACY_BASELINE_RATIO = 0.15
+
+_lock = threading.Lock()
+# (字体名称, 字号) -> GlyphMetrics
+_tables = {}
+
+
+class GlyphMetrics:
+    """
+    一种字体在某个字号下的度量 (单位为 pt)
+    ascent/descent 取自字体的 hhea/OS2 表，字形边界取自 glyf 表；非 TrueType 字体或字形为空时没有边界
+    """
+
+    def __init__(self, font_name, font_size):
+        self.font_name = font_name
+        self.font_size = font_size
+        font = pdfmetrics.getFont(font_name)
+        face = getattr(font, 'face', None)
+        self._face = face
+        self._glyf = None
+        # 字体单位 -> pt
+        self._scale = font_size / 1000
+        if face is not None and hasattr(face, 'glyphPos') and 'glyf' in getattr(face, 'table', {}):
+            self._glyf = face.table['glyf']['offset']
+            self._scale = font_size / face.unitsPerEm
+        self.ascent = face.ascent * font_size / 1000 if face is not None else font_size * 0.8
+        self.descent = face.descent * font_size / 1000 if face is not None else -font_size * 0.2
+        # 汉字 -> (xMin, yMin, xMax, yMax) 或 None
+        self._boxes = {}
+        # (汉字, 格子大小, 对齐方式) -> 文字起点相对格子左下角的偏移
+        self._origins = {}
+
+    def advance(self, char):
+        """字宽 (pt)"""
+        return pdfmetrics.stringWidth(char, self.font_name, self.font_size)
+
+    def bbox(self, char):
+        """字形相对起点 (基线左端) 的实际边界 (xMin, yMin, xMax, yMax)，空白字形或无法读取时返回 None"""
+        try:
+            return self._boxes[char]
+        except KeyError:
+            pass
+        box = None
+        if self._glyf is not None:
+            face = self._face
+            glyph = face.charToGlyph.get(ord(char), 0)
+            if glyph + 1 < len(face.glyphPos) and face.glyphPos[glyph + 1] > face.glyphPos[glyph]:
+                _, x_min, y_min, x_max, y_max = _GLYPH_HEADER.unpack_from(
+                    face._ttf_data, self._glyf + face.glyphPos[glyph])
+                s = self._scale
+                box = (x_min * s, y_min * s, x_max * s, y_max * s)
+        self._boxes[char] = box
+        return box
+
+    def cell_origin(self, char, size, centering='glyph'):
+        """
+        在边长为 size 的格子中放置 char 时，文字起点相对格子左下角的偏移 (dx, dy)
+        :param centering: "glyph" 按字形实际边界居中 (没有边界时按 ascent/descent 居中)；
+                          "legacy" 按字宽水平居中、基线按固定比例估算
+        """
+        key = (char, size, centering)
+        origin = self._origins.get(key)
+        if origin is not None:
+            return origin
+        if centering == 'glyph':
+            box = self.bbox(char)
+            if box is not None:
+                x_min, y_min, x_max, y_max = box
+                origin = (size / 2 - (x_min + x_max) / 2, size / 2 - (y_min + y_max) / 2)
+            else:
+                origin = (size / 2 - self.advance(char) / 2, size / 2 - (self.ascent + self.descent) / 2)
+        else:
+            origin = (size / 2 - self.advance(char) / 2,
+                      (size - self.font_size) / 2 + self.font_size * LEGACY_BASELINE_RATIO)
+        self._origins[key] = origin
+        return origin
+
+
+def get_metrics(font_name, font_size):
+    """取得 (必要时创建) 字体在该字号下的度量表"""
+    key = (font_name, round(font_size, 4))
+    with _lock:
+        table = _tables.get(key)
+        if table is None:
+            table = _tables[key] = GlyphMetrics(font_name, font_size)
+        return table
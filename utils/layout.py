@@ -0,0 +1,78 @@
+from dataclasses import dataclass, asdict
+
+# 排版：只计算每个字落在哪一页、哪一行以及坐标，不涉及任何绘制
+# 渲染 (utils/render.py) 按生成的页面计划绘制，也可以把页面分给多个进程并行绘制
+
+
+@dataclass(frozen=True)
+class RowPlan:
+    """一行练习：一个汉字的田字格行及其上方的笔顺行"""
+    index: int          # 在输入中的序号 (从 0 开始)
+    char: str
+    x: float            # 田字格行左下角
+    y: float
+    stroke_y: float = None  # 笔顺行底部，不显示笔顺时为 None
+
+
+@dataclass(frozen=True)
+class PagePlan:
+    """一页的排版结果"""
+    number: int         # 页码 (从 1 开始)
+    rows: tuple
+    header: bool = False  # 是否绘制标题 (仅第一页)
+
+
+def iter_pages(chars, options):
+    """
+    按 options 逐页排版，每排满一页产出一个 PagePlan
+    :param chars: 汉字序列 (可以是迭代器)
+    :param options: RenderOptions
+    """
+    page_height = options.page_size[1]
+    grid_size = options.grid_size
+    margin_x = options.margin_x
+
+    # 如果有笔顺，笔顺画在格子上面，需要把每页第一行下移，避免和标题重叠
+    stroke_space = 0
+    if options.show_stroke_order:
+        stroke_space = options.stroke_order_height + options.row_spacing/2
+
+    # 下移量 = 格子高度 + 间距 + (笔顺高度 + 间距 if enabled)
+    step = grid_size + options.row_spacing + stroke_space
+
+    # 第一页顶部留出标题空间
+    current_y = page_height - options.header_height - grid_size - stroke_space
+    page_num = 1
+    rows = []
+
+    for index, char in enumerate(chars):
+        # 检查是否需要换页
+        if current_y < options.bottom_margin:
+            yield PagePlan(page_num, tuple(rows), header=page_num == 1)
+            page_num += 1
+            rows = []
+            # 新页面不再绘制标题，使用较小的顶部边距
+            # 假设顶部边距与底部边距相同
+            current_y = page_height - options.bottom_margin - grid_size - stroke_space
+
+        stroke_y = None
+        if options.show_stroke_order:
+            # 笔顺画在格子上方: 格子顶部 + ROW_SPACING/4
+            stroke_y = current_y + grid_size + options.row_spacing/4
+        rows.append(RowPlan(index, char, margin_x, current_y, stroke_y))
+
+        # 移动到下一行
+        current_y -= step
+
+    # 最后一页 (没有字时也输出一个只有标题的空白页)
+    yield PagePlan(page_num, tuple(rows), header=page_num == 1)
+
+
+def layout(chars, options):
+    """返回完整的页面计划列表"""
+    return list(iter_pages(chars, options))
+
+
+def plan_to_dict(pages):
+    """把页面计划转换为可 JSON 序列化的数据，便于检查排版"""
+    return [asdict(page) for page in pages]
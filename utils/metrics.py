@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# 运行统计：各阶段累计耗时和计数器，供 --report 输出 JSON 运行报告
+# 阶段可以嵌套 (例如 "draw" 包含 "stroke_parse")，各阶段的耗时分别累计，不互相扣除
+# 分页并行渲染、批量生成时，子进程中的统计不会汇总到主进程
+
+_lock = threading.Lock()
+# 阶段名 -> [累计秒数, 次数]
+_stages = {}
+_counters = Counter()
+_started = time.perf_counter()
+
+
+@contextmanager
+def stage(name):
+    """统计一个阶段的耗时 (可多次进入，耗时累加)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            entry = _stages.get(name)
+            if entry is None:
+                _stages[name] = [elapsed, 1]
+            else:
+                entry[0] += elapsed
+                entry[1] += 1
+
+
+def count(name, n=1):
+    """计数器加 n"""
+    with _lock:
+        _counters[name] += n
+
+
+def add_counters(counters, prefix=''):
+    """合并其他来源的计数 (如 StrokeManager.stats)"""
+    with _lock:
+        for name, n in counters.items():
+            _counters[prefix + name] += n
+
+
+def reset():
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _started = time.perf_counter()
+
+
+def snapshot():
+    """当前的阶段耗时和计数"""
+    with _lock:
+        return {
+            'elapsed': round(time.perf_counter() - _started, 6),
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls}
+                       for name, (seconds, calls) in sorted(_stages.items(), key=lambda item: -item[1][0])},
+            'counters': dict(sorted(_counters.items())),
+        }
+
+
+def _short_path(path):
+    """项目内的文件显示为相对路径"""
+    try:
+        return os.path.relpath(path) if os.path.isabs(path) else path
+    except ValueError:
+        # Windows 上不同盘符之间没有相对路径
+        return path
+
+
+class Profiler:
+    """
+    可选的 cProfile / tracemalloc 采集
+    :param cpu: 是否用 cProfile 记录函数耗时
+    :param memory: 是否用 tracemalloc 记录内存分配 (会使运行明显变慢)
+    :param top: 报告中列出的条目数
+    """
+
+    def __init__(self, cpu=False, memory=False, top=20):
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+        self._profile = None
+        self._snapshot = None
+        self._peak = None
+
+    def __enter__(self):
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.cpu:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profile is not None:
+            self._profile.disable()
+        if self.memory:
+            import tracemalloc
+            self._peak = tracemalloc.get_traced_memory()[1]
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def result(self, profile_file=None):
+        """
+        采集结果 (可写入 JSON)
+        :param profile_file: 保存完整 cProfile 数据的文件 (可用 snakeviz、pstats 查看)
+        """
+        result = {}
+        if self._profile is not None:
+            import pstats
+            if profile_file:
+                self._profile.dump_stats(profile_file)
+            stats = pstats.Stats(self._profile)
+            rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:self.top]
+            result['cpu'] = {
+                'file': profile_file,
+                'top_cumulative': [
+                    {'function': f"{_short_path(path)}:{line}({name})",
+                     'calls': calls, 'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)}
+                    for (path, line, name), (_, calls, tottime, cumtime, _) in rows
+                ],
+            }
+        if self._snapshot is not None:
+            stats = self._snapshot.statistics('lineno')[:self.top]
+            result['memory'] = {
+                'peak_bytes': self._peak,
+                'top_allocations': [
+                    {'location': f"{_short_path(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+                     'bytes': s.size, 'count': s.count}
+                    for s in stats
+                ],
+            }
+        return result
+
+
+def write_report(path, **extra):
+    """写出 JSON 运行报告：阶段耗时、计数器，以及 extra 中的其他信息"""
+    report = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'argv': sys.argv,
+    }
+    report.update(snapshot())
+    report.update(extra)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
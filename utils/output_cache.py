@@ -0,0 +1,139 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import dataclasses
+
+from reportlab import Version as REPORTLAB_VERSION
+from reportlab.lib import colors
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '.output_cache')
+
+# 缓存键格式版本：绘制方式改变 (输出的 PDF 内容不同) 时加 1，旧缓存自然失效
+KEY_VERSION = 2
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """计算文件内容的 SHA-1"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _option_value(value):
+    """把选项值转换为稳定的、可 JSON 序列化的形式"""
+    if isinstance(value, colors.Color):
+        return ['color'] + [round(v, 6) for v in value.rgba()]
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return [_option_value(v) for v in value]
+    return value
+
+
+def render_key(chars, options, date_text, font_hash, data_hash=None, words=None, renderer=None):
+    """
+    根据所有影响输出的输入计算缓存键
+    :param chars: 汉字列表
+    :param options: RenderOptions
+    :param date_text: 实际显示的日期文本 ("today" 已转换为当天日期)
+    :param font_hash: 字体文件内容的哈希
+    :param data_hash: 笔顺数据文件的哈希 (不显示笔顺时为 None)
+    :param words: {汉字: 组词列表} (不显示笔顺时为 None)
+    :param renderer: 笔画路径转换方式 (StrokeManager.renderer，两种方式生成的 PDF 不同；不显示笔顺时为 None)
+    """
+    payload = {
+        'version': KEY_VERSION,
+        'reportlab': REPORTLAB_VERSION,
+        'chars': ''.join(chars),
+        'options': {field.name: _option_value(getattr(options, field.name))
+                    for field in dataclasses.fields(options) if field.name != 'font_path'},
+        'date': date_text,
+        'font': font_hash,
+        'strokes': data_hash,
+        'renderer': renderer,
+        'words': words,
+    }
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class OutputCache:
+    """
+    按内容寻址的 PDF 缓存：键为所有输入的哈希，每个 PDF 保存为一个文件
+    总大小超过 max_bytes 时按最近使用时间 (文件 mtime) 淘汰；多进程同时读写是安全的
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # 本进程内的命中统计
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        """按 OUTPUT_CACHE_MAX_SIZE 创建缓存，设为 0 时返回 None (不缓存)"""
+        max_bytes = getattr(settings, 'OUTPUT_CACHE_MAX_SIZE', 0)
+        if not max_bytes:
+            return None
+        return cls(getattr(settings, 'OUTPUT_CACHE_DIR', None) or DEFAULT_CACHE_DIR, max_bytes)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pdf")
+
+    def get(self, key):
+        """命中时返回缓存文件路径，否则返回 None"""
+        path = self._path(key)
+        try:
+            # 更新使用时间，供淘汰时参考
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, pdf):
+        """保存 PDF 字节，返回缓存文件路径"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(pdf)
+        os.replace(tmp_path, path)
+        self._evict()
+        return path
+
+    def _evict(self):
+        """按最近使用时间淘汰，直到总大小降到上限的 90% 以下"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,439 @@
+import os
+import math
+import logging
+import threading
+import importlib.util
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
+
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+
+from utils.startup import lazy_import
+from utils import metrics
+from utils.layout import layout
+from utils.lru import LRUCache
+from utils.glyph_metrics import get_metrics, FONT_SIZE_RATIO
+from utils.render import RenderOptions, RenderContext, resolve_font_path, resolve_date_text, volume_path
+
+logger = logging.getLogger(__name__)
+
+# 图片输出：按与 PDF 相同的页面计划 (utils.layout.PagePlan) 直接绘制 SVG 或 PNG，不经过 PDF
+# 字的位置取自字形度量表，笔顺取自 StrokeManager 缓存的几何数据，与 PDF 版面一致
+
+# Pillow 为可选依赖，只在输出 PNG 时导入
+HAS_PIL = importlib.util.find_spec('PIL') is not None
+
+IMAGE_FORMATS = ('svg', 'png')
+CONTENT_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+# SVG 中文字的字体：优先使用字体文件中的名称，设备上没有时依次尝试常见的楷体
+SVG_FALLBACK_FONTS = "KaiTi, STKaiti, serif"
+# 低于 SUPERSAMPLE_BELOW_DPI 的 PNG (如缩略图) 先按 PNG_SUPERSAMPLE 倍放大绘制再缩小，使笔画和田字格边缘平滑
+PNG_SUPERSAMPLE = 2
+SUPERSAMPLE_BELOW_DPI = 150
+# 曲线展开为折线时每段的最大长度 (像素)
+CURVE_STEP_PX = 3
+# 进程内缓存的田字格行、文字蒙版数量 (同一进程连续生成多页、多份时复用)
+MASK_CACHE_SIZE = 4096
+
+_cache_lock = threading.Lock()
+# (字体路径, 像素大小) -> ImageFont
+_pil_fonts = {}
+_masks = LRUCache(MASK_CACHE_SIZE)
+
+
+def _rgb(color):
+    return tuple(int(round(v * 255)) for v in color.rgb())
+
+
+def _hex(color):
+    return '#%02x%02x%02x' % _rgb(color)
+
+
+def _num(value):
+    """SVG 中的坐标，保留两位小数"""
+    text = f"{value:.2f}".rstrip('0').rstrip('.')
+    return text if text != '-0' else '0'
+
+
+class _SvgPage:
+    """把一页绘制为 SVG (单位为 pt，坐标原点在左上角)；田字格行和笔顺定义一次，之后按引用放置"""
+
+    def __init__(self, width, height, family):
+        self.width = width
+        self.height = height
+        self.family = family
+        self._defs = []
+        self._body = []
+        self._ids = set()
+
+    def grid_row(self, x, y, size, count, color):
+        ref = f"grid{count}_{int(round(size * 100))}"
+        if ref not in self._ids:
+            self._ids.add(ref)
+            lines = ''.join(
+                f'<path d="M{_num(i * size)} {_num(size / 2)}h{_num(size)}M{_num(i * size + size / 2)} 0v{_num(size)}"/>'
+                for i in range(count))
+            rects = ''.join(f'<rect x="{_num(i * size)}" y="0" width="{_num(size)}" height="{_num(size)}"/>'
+                            for i in range(count))
+            self._defs.append(
+                f'<g id="{ref}" fill="none" stroke="{_hex(color)}">'
+                f'<g stroke-width="0.3" stroke-dasharray="2 2">{lines}</g>'
+                f'<g stroke-width="1">{rects}</g></g>')
+        self._body.append(f'<use xlink:href="#{ref}" x="{_num(x)}" y="{_num(self.height - y - size)}"/>')
+
+    def text(self, x, y, text, font_size, color, anchor='start', family=None):
+        self._body.append(
+            f'<text x="{_num(x)}" y="{_num(self.height - y)}" font-size="{_num(font_size)}" '
+            f'font-family={quoteattr(family or self.family)} fill="{_hex(color)}"'
+            + (f' text-anchor="{anchor}"' if anchor != 'start' else '')
+            + f'>{escape(text)}</text>')
+
+    def stroke_steps(self, char, x, y, height, geometry, spacing):
+        """分步笔顺：第 k 步引用第 k-1 步再加上第 k 笔"""
+        ref = f"s{ord(char):X}_{int(round(height * 100))}"
+        if ref not in self._ids:
+            self._ids.add(ref)
+            for k, (points, operators) in enumerate(geometry):
+                self._defs.append(f'<path id="{ref}p{k}" d="{self._path_data(points, operators)}"/>')
+                previous = f'<use xlink:href="#{ref}k{k - 1}"/>' if k else ''
+                self._defs.append(f'<g id="{ref}k{k}">{previous}<use xlink:href="#{ref}p{k}"/></g>')
+            steps = ''.join(f'<use xlink:href="#{ref}k{k}" x="{_num(k * (height + spacing))}"/>'
+                            for k in range(len(geometry)))
+            self._defs.append(f'<g id="{ref}">{steps}</g>')
+        # 笔画坐标的 y 轴向上，放置时翻转
+        self._body.append(f'<use xlink:href="#{ref}" transform="translate({_num(x)} {_num(self.height - y)}) scale(1 -1)"/>')
+
+    @staticmethod
+    def _path_data(points, operators):
+        parts = []
+        i = 0
+        for op in operators:
+            if op == 0:
+                parts.append(f"M{_num(points[i])} {_num(points[i + 1])}")
+                i += 2
+            elif op == 1:
+                parts.append(f"L{_num(points[i])} {_num(points[i + 1])}")
+                i += 2
+            elif op == 2:
+                parts.append("C" + " ".join(_num(v) for v in points[i:i + 6]))
+                i += 6
+            else:
+                parts.append("Z")
+        return ''.join(parts)
+
+    def finish(self):
+        head = (f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                f'width="{_num(self.width)}pt" height="{_num(self.height)}pt" '
+                f'viewBox="0 0 {_num(self.width)} {_num(self.height)}">'
+                f'<rect width="100%" height="100%" fill="#ffffff"/>')
+        defs = f"<defs>{''.join(self._defs)}</defs>" if self._defs else ''
+        return f"{head}{defs}{''.join(self._body)}</svg>\n".encode('utf-8')
+
+
+class _PngPage:
+    """用 Pillow 把一页绘制为 PNG"""
+
+    def __init__(self, width, height, dpi, font_path):
+        self.Image = lazy_import('PIL.Image')
+        self.ImageDraw = lazy_import('PIL.ImageDraw')
+        self.ImageFont = lazy_import('PIL.ImageFont')
+        self.height = height
+        self.dpi = dpi
+        self.supersample = PNG_SUPERSAMPLE if dpi < SUPERSAMPLE_BELOW_DPI else 1
+        # pt -> 绘制用的像素
+        self.scale = dpi / 72 * self.supersample
+        self.size = (max(1, math.ceil(width * dpi / 72)), max(1, math.ceil(height * dpi / 72)))
+        self.image = self.Image.new('RGB', (self.size[0] * self.supersample, self.size[1] * self.supersample), 'white')
+        self.draw = self.ImageDraw.Draw(self.image)
+        self.font_path = font_path
+
+    def _xy(self, x, y):
+        return x * self.scale, (self.height - y) * self.scale
+
+    def _width(self, line_width):
+        return max(1, round(line_width * self.scale))
+
+    def _dashed(self, draw, start, end, width, dash=2):
+        """与 PDF 相同的 [2, 2] 虚线 (相位从线段起点开始)"""
+        (x0, y0), (x1, y1) = start, end
+        length = ((x1 - x0) ** 2 + (y1 - y0) ** 2) ** 0.5
+        step = dash * self.scale
+        t = 0
+        while t < length:
+            a, b = t / length, min(t + step, length) / length
+            draw.line([(x0 + (x1 - x0) * a, y0 + (y1 - y0) * a),
+                       (x0 + (x1 - x0) * b, y0 + (y1 - y0) * b)], fill=255, width=width)
+            t += 2 * step
+
+    def _grid_mask(self, size, count):
+        """一整行田字格的蒙版 (同一进程中只画一次，各行按位置贴上)"""
+        key = ('grid', self.scale, size, count)
+        with _cache_lock:
+            cached = _masks.get(key)
+        if cached is not None:
+            return cached
+        s = self.scale
+        thin, thick = self._width(0.3), self._width(1)
+        # 外框线宽的一半画在格子外
+        pad = thick
+        mask = self.Image.new('L', (math.ceil(count * size * s) + 2 * pad, math.ceil(size * s) + 2 * pad), 0)
+        draw = self.ImageDraw.Draw(mask)
+        for i in range(count):
+            left = pad + i * size * s
+            self._dashed(draw, (left, pad + size * s / 2), (left + size * s, pad + size * s / 2), thin)
+            self._dashed(draw, (left + size * s / 2, pad), (left + size * s / 2, pad + size * s), thin)
+        for i in range(count):
+            left = pad + i * size * s
+            corners = [(left, pad), (left + size * s, pad), (left + size * s, pad + size * s),
+                       (left, pad + size * s), (left, pad)]
+            draw.line(corners, fill=255, width=thick, joint='curve')
+        cached = (mask, pad)
+        with _cache_lock:
+            _masks[key] = cached
+        return cached
+
+    def grid_row(self, x, y, size, count, color):
+        mask, pad = self._grid_mask(size, count)
+        px, py = self._xy(x, y + size)
+        self.draw.bitmap((round(px) - pad, round(py) - pad), mask, fill=_rgb(color))
+
+    def _font(self, font_size):
+        px = round(font_size * self.scale, 2)
+        key = (self.font_path, px)
+        with _cache_lock:
+            font = _pil_fonts.get(key)
+        if font is None:
+            font = self.ImageFont.truetype(self.font_path, px)
+            with _cache_lock:
+                _pil_fonts[key] = font
+        return font
+
+    def text(self, x, y, text, font_size, color, anchor='start', family=None):
+        # 同样的字 (如一行中的描红字) 只光栅化一次
+        key = (self.font_path, self.scale, text, font_size, anchor)
+        with _cache_lock:
+            cached = _masks.get(key)
+        if cached is None:
+            font = self._font(font_size)
+            anchor = {'start': 'ls', 'middle': 'ms', 'end': 'rs'}[anchor]
+            left, top, right, bottom = font.getbbox(text, anchor=anchor)
+            mask = self.Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+            self.ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor=anchor)
+            cached = (mask, left, top)
+            with _cache_lock:
+                _masks[key] = cached
+        mask, left, top = cached
+        px, py = self._xy(x, y)
+        self.draw.bitmap((round(px + left), round(py + top)), mask, fill=_rgb(color))
+
+    def _polygons(self, points, operators):
+        """把一笔的轮廓展开为折线 (单位为像素，原点为笔顺格左下角，y 轴向下)"""
+        polygons = []
+        current = []
+        i = 0
+        for op in operators:
+            if op == 0:
+                if len(current) > 2:
+                    polygons.append(current)
+                current = [(points[i], points[i + 1])]
+                i += 2
+            elif op == 1:
+                current.append((points[i], points[i + 1]))
+                i += 2
+            elif op == 2:
+                x0, y0 = current[-1]
+                x1, y1, x2, y2, x3, y3 = points[i:i + 6]
+                # 按控制多边形的长度决定分段数
+                length = (abs(x1 - x0) + abs(y1 - y0) + abs(x2 - x1) + abs(y2 - y1)
+                          + abs(x3 - x2) + abs(y3 - y2)) * self.scale
+                n = max(2, min(64, int(length / CURVE_STEP_PX)))
+                for j in range(1, n + 1):
+                    t = j / n
+                    u = 1 - t
+                    a, b, c, d = u * u * u, 3 * u * u * t, 3 * u * t * t, t * t * t
+                    current.append((a * x0 + b * x1 + c * x2 + d * x3, a * y0 + b * y1 + c * y2 + d * y3))
+                i += 6
+        if len(current) > 2:
+            polygons.append(current)
+        scale = self.scale
+        return [[(px * scale, -py * scale) for px, py in polygon] for polygon in polygons]
+
+    def stroke_steps(self, char, x, y, height, geometry, spacing):
+        # 同一个字的分步笔顺只光栅化一次 (相当于 PDF 中的 Form)
+        key = ('strokes', self.scale, char, height)
+        with _cache_lock:
+            cached = _masks.get(key)
+        if cached is None:
+            strokes = [self._polygons(points, operators) for points, operators in geometry]
+            s = self.scale
+            # 笔画可能略微超出笔顺格，四周留出余量
+            pad = math.ceil(height * s * 0.1)
+            width = len(strokes) * (height + spacing) * s
+            mask = self.Image.new('L', (math.ceil(width) + 2 * pad, math.ceil(height * s) + 2 * pad), 0)
+            draw = self.ImageDraw.Draw(mask)
+            for step in range(len(strokes)):
+                ox, oy = pad + step * (height + spacing) * s, pad + height * s
+                # 每个笔画单独填充，重叠部分不会互相抵消
+                for polygons in strokes[:step + 1]:
+                    for polygon in polygons:
+                        draw.polygon([(ox + px, oy + py) for px, py in polygon], fill=255)
+            cached = (mask, pad)
+            with _cache_lock:
+                _masks[key] = cached
+        mask, pad = cached
+        px, py = self._xy(x, y + height)
+        self.draw.bitmap((round(px) - pad, round(py) - pad), mask, fill=(0, 0, 0))
+
+    def finish(self):
+        image = self.image
+        if self.supersample > 1:
+            # 按块取平均缩小，比重采样滤波快得多
+            image = image.reduce(self.supersample)
+        buffer = BytesIO()
+        image.save(buffer, 'PNG', dpi=(self.dpi, self.dpi), optimize=False)
+        return buffer.getvalue()
+
+
+def _draw_stroke_order(painter, stroke_manager, char, x, y, height):
+    """与 StrokeManager.draw_stroke_order 相同的笔顺行：分步笔顺 + 右侧组词"""
+    geometry = stroke_manager.get_stroke_geometry(char, height)
+    if not geometry:
+        return
+    spacing = height * 0.2 # 间距为高度的 20%
+    painter.stroke_steps(char, x, y, height, geometry, spacing)
+    words = stroke_manager.get_words(char)
+    if words:
+        words_x = x + len(geometry) * (height + spacing) + height * 0.3
+        painter.text(words_x, y + height * 0.35, " / ".join(words[:3]), int(height * 0.9), colors.black)
+
+
+def _paint_page(painter, page, options, font_name, stroke_manager=None):
+    """按页面计划绘制一页 (与 utils.render.draw_page 的版面相同)"""
+    page_width, page_height = options.page_size
+    if page.header:
+        painter.text(page_width / 2, page_height - 18 * mm, options.title, 24, colors.black, 'middle')
+        margin_x = options.margin_x
+        painter.text(page_width - margin_x, page_height - 26 * mm, resolve_date_text(options.date_text),
+                     12, colors.black, 'end')
+        if options.student:
+            painter.text(margin_x, page_height - 26 * mm, f"姓名：{options.student}", 12, colors.black)
+
+    size = options.grid_size
+    font_size = size * FONT_SIZE_RATIO
+    glyphs = get_metrics(font_name, font_size)
+    for row in page.rows:
+        if row.stroke_y is not None and stroke_manager is not None:
+            _draw_stroke_order(painter, stroke_manager, row.char, row.x, row.stroke_y, options.stroke_order_height)
+
+        painter.grid_row(row.x, row.y, size, options.grid_count_per_row, options.grid_color)
+
+        dx, dy = glyphs.cell_origin(row.char, size, options.char_centering)
+        painter.text(row.x + dx, row.y + dy, row.char, font_size, options.text_color_solid)
+        for i in range(1, options.effective_trace_count + 1):
+            painter.text(row.x + i * size + dx, row.y + dy, row.char, font_size, options.text_color_dashed)
+
+    painter.text(page_width / 2, 10 * mm, f"- {page.number} -", 10, colors.black, 'middle', family='Helvetica')
+
+
+def render_page_image(page, options, context, fmt='png', dpi=150):
+    """把一页绘制为 SVG 或 PNG，返回文件内容"""
+    font_name = context.register_font(options.font_path, options.font_subset_ascii)
+    if not font_name:
+        raise RuntimeError(f"无法注册字体: {options.font_path}")
+    stroke_manager = context.get_stroke_manager() if options.show_stroke_order else None
+    page_width, page_height = options.page_size
+    if fmt == 'svg':
+        family = pdfmetrics.getFont(font_name).face.familyName
+        if isinstance(family, bytes):
+            family = family.decode('utf-8', 'replace')
+        painter = _SvgPage(page_width, page_height, f"{family}, {SVG_FALLBACK_FONTS}")
+    elif fmt == 'png':
+        if not HAS_PIL:
+            raise RuntimeError("输出 PNG 需要安装 Pillow: pip install pillow")
+        painter = _PngPage(page_width, page_height, dpi, resolve_font_path(options.font_path))
+    else:
+        raise ValueError(f"不支持的图片格式: {fmt} (可选 {', '.join(IMAGE_FORMATS)})")
+    _paint_page(painter, page, options, font_name, stroke_manager)
+    return painter.finish()
+
+
+# 分页绘制图片的工作进程内共享的 RenderContext
+_image_worker = {}
+
+
+def _init_image_worker(stroke_spec=None):
+    # 与调用方使用相同的数据目录和笔画解析方式 (见 RenderContext.stroke_spec)
+    context = RenderContext(stroke_spec=stroke_spec)
+    multiprocessing.util.Finalize(context, context.close, exitpriority=10)
+    _image_worker['context'] = context
+
+
+def _render_page_task(page, options, fmt, dpi):
+    if not _image_worker:
+        _init_image_worker()
+    return render_page_image(page, options, _image_worker['context'], fmt, dpi)
+
+
+def render_images(chars, options=None, output_path=None, fmt='png', dpi=150, context=None, workers=1, pages=None):
+    """
+    把练习纸的每一页绘制为一张图片 (SVG 或 PNG)
+    :param output_path: 输出文件名，按页编号保存为 name_001.png, name_002.png ...；为 None 时返回各页的内容
+    :param dpi: PNG 的分辨率 (SVG 为矢量图，忽略)
+    :param workers: 大于 1 时各页交给多个进程并行绘制
+    :param pages: 只绘制这些页码 (从 1 开始)，默认全部；生成缩略图时通常只需要第一页
+    :return: 文件路径列表，或 output_path 为 None 时的各页内容 (bytes) 列表
+    """
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"不支持的图片格式: {fmt} (可选 {', '.join(IMAGE_FORMATS)})")
+    if options is None:
+        options = RenderOptions.from_settings()
+    owns_context = context is None
+    if owns_context:
+        context = RenderContext()
+
+    try:
+        if not context.register_font(options.font_path, options.font_subset_ascii):
+            raise RuntimeError(f"无法注册字体: {options.font_path}")
+        with metrics.stage('layout'):
+            plan = layout(list(chars), options)
+        if pages is not None:
+            wanted = set(pages)
+            plan = [page for page in plan if page.number in wanted]
+
+        stroke_manager = context.get_stroke_manager() if options.show_stroke_order else None
+        if stroke_manager is not None:
+            with metrics.stage('prefetch_words'):
+                stroke_manager.prefetch_words(row.char for page in plan for row in page.rows)
+
+        workers = min(workers, len(plan))
+        if workers > 1:
+            if stroke_manager is not None:
+                # 工作进程从磁盘读取组词缓存
+                stroke_manager.flush()
+            with metrics.stage('draw_image_parallel'):
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_image_worker,
+                                         initargs=(context.stroke_spec(),)) as pool:
+                    images = list(pool.map(_render_page_task, plan, *zip(*[(options, fmt, dpi)] * len(plan))))
+        else:
+            with metrics.stage('draw_image'):
+                images = [render_page_image(page, options, context, fmt, dpi) for page in plan]
+        metrics.count('image_pages', len(images))
+    finally:
+        if owns_context:
+            context.close()
+
+    if output_path is None:
+        return images
+    root = os.path.splitext(output_path)[0]
+    paths = []
+    for page, data in zip(plan, images):
+        path = volume_path(f"{root}.{fmt}", page.number)
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
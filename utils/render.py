@@ -0,0 +1,650 @@
+import os
+import logging
+import sys
+import shutil
+import datetime
+import itertools
+import threading
+import dataclasses
+import importlib.util
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.lib import colors
+
+from utils.startup import lazy_import
+from utils import metrics
+from utils.layout import layout, iter_pages
+from utils.output_cache import render_key, file_sha1
+from utils.font_cache import make_ttfont
+from utils.glyph_metrics import get_metrics, FONT_SIZE_RATIO
+
+logger = logging.getLogger(__name__)
+
+# pypdf 为可选依赖，只在并行渲染合并结果时导入
+HAS_PYPDF = importlib.util.find_spec('pypdf') is not None
+
+PDF_TITLE = "汉字书写练习"
+
+# 找不到 FONT_PATH 时尝试的备用字体
+FALLBACK_FONT_PATH = r"C:\Windows\Fonts\simhei.ttf"
+
+# pdfmetrics 的字体注册表是进程级的，所有 RenderContext 共用
+_font_lock = threading.Lock()
+_font_names = {}
+# (字体路径, ascii_readable) -> {'name', 'seconds', 'cached'}，用于报告字体加载耗时
+font_load_info = {}
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """一次渲染的全部排版和样式选项（不可变，可在线程间共享）"""
+    font_path: str = r"C:\Windows\Fonts\simkai.ttf"
+    grid_size: float = 13 * mm
+    grid_count_per_row: int = 12
+    row_spacing: float = 4 * mm
+    grid_color: colors.Color = colors.red
+    text_color_solid: colors.Color = colors.black
+    text_color_dashed: colors.Color = colors.Color(0.7, 0.7, 0.7)
+    trace_count: int = 4
+    date_text: str = "today"
+    title: str = "渤仔生字专项练习"
+    student: str = None
+    header_height: float = 26 * mm
+    bottom_margin: float = 16 * mm
+    show_stroke_order: bool = True
+    stroke_order_height: float = 5 * mm
+    font_subset_ascii: bool = False
+    char_centering: str = "glyph"
+    page_size: tuple = A4
+
+    @classmethod
+    def from_settings(cls, source=None, **overrides):
+        """
+        从配置模块 (默认 config.settings) 读取选项，再应用 overrides
+        配置项名称为字段名的大写形式，例如 GRID_SIZE -> grid_size
+        """
+        if source is None:
+            from config import settings as source
+        values = {}
+        for field in dataclasses.fields(cls):
+            name = field.name.upper()
+            if hasattr(source, name):
+                values[field.name] = getattr(source, name)
+        values.update(overrides)
+        return cls(**values)
+
+    def replace(self, **changes):
+        """返回修改了部分选项的新对象"""
+        return dataclasses.replace(self, **changes)
+
+    @property
+    def margin_x(self):
+        """田字格行的左边距（水平居中）"""
+        return (self.page_size[0] - self.grid_count_per_row * self.grid_size) / 2
+
+    @property
+    def effective_trace_count(self):
+        """描红字数，不超过每行格子数 (第一个格子为范例字)"""
+        return max(0, min(self.trace_count, self.grid_count_per_row - 1))
+
+
+# 外部传入的数值选项的取值范围 (避免格子过小、过多导致生成的文件过大)
+OPTION_LIMITS = {
+    'grid_size': (5 * mm, 100 * mm),
+    'grid_count_per_row': (1, 30),
+    'row_spacing': (0, 50 * mm),
+    'trace_count': (0, 30),
+    'header_height': (0, 200 * mm),
+    'bottom_margin': (0, 200 * mm),
+    'stroke_order_height': (1 * mm, 30 * mm),
+}
+# 外部传入的字符串选项的可选值
+OPTION_CHOICES = {
+    'char_centering': ('glyph', 'legacy'),
+}
+
+
+def _coerce(value, current):
+    """把字符串形式的选项值转换为与默认选项相同的类型，类型不符时抛出 ValueError"""
+    if isinstance(value, str):
+        if isinstance(current, bool):
+            return value.strip().lower() in ('1', 'true', 'yes', 'y', '是')
+        if isinstance(current, int):
+            return int(value)
+        if isinstance(current, float):
+            return float(value)
+        if isinstance(current, colors.Color):
+            return colors.toColor(value)
+        if isinstance(current, tuple):
+            raise ValueError(f"不支持的值: {value}")
+        return value
+    if isinstance(current, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"应为 true / false: {value!r}")
+    elif isinstance(current, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"应为数字: {value!r}")
+        return type(current)(value)
+    elif isinstance(current, colors.Color):
+        if not isinstance(value, colors.Color):
+            raise ValueError(f"应为颜色: {value!r}")
+    elif isinstance(current, tuple):
+        # 页面大小等: 两个正数
+        if (not isinstance(value, (list, tuple)) or len(value) != len(current)
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0 for v in value)):
+            raise ValueError(f"应为 {len(current)} 个正数: {value!r}")
+        return tuple(float(v) for v in value)
+    elif value is not None and not isinstance(value, str):
+        raise ValueError(f"应为字符串: {value!r}")
+    return value
+
+
+def _check_option(name, value):
+    """检查选项值是否在允许的范围内"""
+    if name in OPTION_LIMITS:
+        low, high = OPTION_LIMITS[name]
+        if not low <= value <= high:
+            raise ValueError(f"选项 {name} 应在 {low:.4g} 到 {high:.4g} 之间: {value}")
+    if name in OPTION_CHOICES and value not in OPTION_CHOICES[name]:
+        raise ValueError(f"选项 {name} 应为 {' / '.join(OPTION_CHOICES[name])} 之一: {value}")
+
+
+def build_options(base, options, student=None):
+    """
+    在 base (RenderOptions) 的基础上应用外部传入的选项 (批量清单、HTTP 请求)，选项名不区分大小写
+    选项名未知、类型不符或超出 OPTION_LIMITS 时抛出 ValueError
+    """
+    fields = {field.name for field in dataclasses.fields(RenderOptions)}
+    changes = {}
+    for key, value in options.items():
+        name = key.lower()
+        if name not in fields:
+            raise ValueError(f"未知的选项: {key}")
+        try:
+            value = _coerce(value, getattr(base, name))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"选项 {key} 的值不合法: {e}") from e
+        _check_option(name, value)
+        changes[name] = value
+    if student:
+        changes['student'] = student
+    return base.replace(**changes)
+
+
+def resolve_date_text(date_text):
+    """把 DATE_TEXT 设置转换为实际显示的日期文本"""
+    if date_text == 'today':
+        return datetime.datetime.now().strftime("%Y年%m月%d日")
+    if date_text:
+        return date_text
+    return "________年____月______日"
+
+
+class RenderContext:
+    """
+    渲染共享资源：已注册的字体、笔顺管理器（含各类缓存）
+    线程安全，可被多个线程中的 render 调用同时使用
+    """
+
+    def __init__(self, stroke_manager=None, output_cache=None, stroke_spec=None):
+        """
+        :param stroke_spec: 没有传入 stroke_manager 时，第一次需要笔顺时按这些参数 (data_dir、renderer) 创建 StrokeManager
+        """
+        self._lock = threading.Lock()
+        self._fonts = {}
+        self._font_hashes = {}
+        self._stroke_manager = stroke_manager
+        self._stroke_spec = stroke_spec or {}
+        # 外部传入的 StrokeManager 由调用方负责关闭
+        self._owns_stroke_manager = stroke_manager is None
+        # 输入完全相同时直接返回已生成的 PDF (utils.output_cache.OutputCache)，为 None 时不缓存
+        self.output_cache = output_cache
+
+    def register_font(self, font_path, ascii_readable=False):
+        """注册中文字体，返回字体名称；找不到字体时返回 None"""
+        key = (font_path, ascii_readable)
+        with self._lock:
+            if key in self._fonts:
+                return self._fonts[key]
+            name = register_font_file(font_path, ascii_readable)
+            self._fonts[key] = name
+            return name
+
+    def font_hash(self, font_path):
+        """字体文件内容的哈希 (按路径、大小和修改时间缓存，文件不变时只计算一次)"""
+        path = resolve_font_path(font_path)
+        if path is None:
+            return None
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._font_hashes.get(key)
+        if digest is None:
+            digest = file_sha1(path)
+            with self._lock:
+                self._font_hashes[key] = digest
+        return digest
+
+    def render_key(self, chars, options):
+        """计算一次渲染的缓存键 (包含组词，调用前应已查询过缺失的组词；这里不访问网络)"""
+        data_hash = words = renderer = None
+        if options.show_stroke_order:
+            stroke_manager = self.get_stroke_manager()
+            data_hash = stroke_manager.data_version()
+            words = stroke_manager.known_words(chars)
+            renderer = stroke_manager.renderer
+        return render_key(chars, options, resolve_date_text(options.date_text),
+                          self.font_hash(options.font_path), data_hash, words, renderer)
+
+    def get_stroke_manager(self):
+        """第一次需要笔顺时创建 StrokeManager"""
+        with self._lock:
+            if self._stroke_manager is None:
+                StrokeManager = lazy_import('utils.stroke_manager').StrokeManager
+                self._stroke_manager = StrokeManager(**self._stroke_spec)
+            return self._stroke_manager
+
+    def stroke_spec(self):
+        """在工作进程中创建等价 StrokeManager 的参数 (可序列化)，使子进程读取相同的数据目录和组词缓存"""
+        with self._lock:
+            if self._stroke_manager is None:
+                return dict(self._stroke_spec)
+            return {'data_dir': self._stroke_manager.data_dir, 'renderer': self._stroke_manager.renderer}
+
+    def counters(self):
+        """笔顺管理器和生成结果缓存的命中计数 (用于运行报告)"""
+        with self._lock:
+            counters = dict(self._stroke_manager.stats) if self._stroke_manager is not None else {}
+        if self.output_cache is not None:
+            counters['output_hit'] = self.output_cache.hits
+            counters['output_miss'] = self.output_cache.misses
+        return counters
+
+    def close(self):
+        with self._lock:
+            if self._stroke_manager is not None and self._owns_stroke_manager:
+                self._stroke_manager.close()
+                self._stroke_manager = None
+
+
+def resolve_font_path(font_path):
+    """返回实际使用的字体文件的绝对路径 (找不到时使用备用字体)，都不存在时返回 None"""
+    for path in (font_path, FALLBACK_FONT_PATH):
+        if os.path.exists(path):
+            return os.path.abspath(path)
+    return None
+
+
+def register_font_file(font_path, ascii_readable=False):
+    """
+    在进程级注册表中注册字体文件（每个文件只解析一次，解析结果缓存在 data/.font_cache）
+    :param ascii_readable: 是否把全部 ASCII 字符放入第一个子集 (见 utils.font_cache.make_ttfont)
+    """
+    path = resolve_font_path(font_path)
+    if path is None:
+        logger.error("错误：未找到中文字体文件。请检查 config/settings.py 中的 FONT_PATH 设置。")
+        return None
+    if path != os.path.abspath(font_path):
+        logger.warning(f"未找到字体 {font_path}，使用黑体: {FALLBACK_FONT_PATH}")
+
+    key = (path, ascii_readable)
+    with _font_lock:
+        if key in _font_names:
+            return _font_names[key]
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in pdfmetrics.getRegisteredFontNames():
+            name = f"{name}-{len(_font_names)}"
+        try:
+            with metrics.stage('font_load'):
+                font, seconds, cached = make_ttfont(name, path, ascii_readable)
+            pdfmetrics.registerFont(font)
+        except Exception as e:
+            logger.error(f"字体注册失败: {e}")
+            return None
+        _font_names[key] = name
+        font_load_info[key] = {'name': name, 'seconds': seconds, 'cached': cached}
+        return name
+
+
+def draw_tian_grid_row(c, x, y, size, count, color):
+    """绘制一整行田字格（整行只生成一次 Form，之后按引用放置）"""
+    form_name = f"TianGridRow_{count}_{int(round(size * 100))}"
+    if not c.hasForm(form_name):
+        c.beginForm(form_name, lowerx=0, lowery=0, upperx=count * size, uppery=size)
+        c.setStrokeColor(color)
+
+        # 1. 内部十字 (虚线)，每格单独起笔以保持与单格绘制相同的虚线相位
+        c.setLineWidth(0.3)
+        c.setDash([2, 2], 0)
+        for i in range(count):
+            cell_x = i * size
+            c.line(cell_x, size/2, cell_x + size, size/2)
+            c.line(cell_x + size/2, 0, cell_x + size/2, size)
+
+        # 2. 外框 (实线)，画在虚线之上
+        c.setLineWidth(1)
+        c.setDash([], 0)
+        for i in range(count):
+            c.rect(i * size, 0, size, size)
+        c.endForm()
+
+    c.saveState()
+    c.translate(x, y)
+    c.doForm(form_name)
+    c.restoreState()
+
+
+def draw_char_row(c, char, x, y, font_name, options):
+    """在一个文本对象中绘制一行的范例字和描红字"""
+    size = options.grid_size
+    font_size = size * FONT_SIZE_RATIO
+    # 字在格子中的位置只取决于字形度量，每行查一次表
+    dx, dy = get_metrics(font_name, font_size).cell_origin(char, size, options.char_centering)
+    text_y = y + dy
+
+    text = c.beginText()
+    text.setFont(font_name, font_size)
+
+    # 第一个字：黑色实体
+    text.setFillColor(options.text_color_solid)
+    text.setTextOrigin(x + dx, text_y)
+    text.textOut(char)
+
+    # 描红字
+    text.setFillColor(options.text_color_dashed)
+    for i in range(1, options.effective_trace_count + 1):
+        text.setTextOrigin(x + i * size + dx, text_y)
+        text.textOut(char)
+
+    c.drawText(text)
+
+
+def draw_header(c, font_name, options):
+    """绘制页面标题"""
+    page_width, page_height = options.page_size
+    c.saveState()
+
+    # 标题
+    c.setFont(font_name, 24)
+    c.setFillColor(colors.black)
+    c.drawCentredString(page_width / 2, page_height - 18 * mm, options.title)
+
+    # 姓名和日期
+    c.setFont(font_name, 12)
+    # 计算右边距，与田字格对齐
+    margin_x = options.margin_x
+    right_align_x = page_width - margin_x
+
+    c.drawRightString(right_align_x, page_height - 26 * mm, resolve_date_text(options.date_text))
+
+    # 姓名 (批量生成时按学生填写)
+    if options.student:
+        c.drawString(margin_x, page_height - 26 * mm, f"姓名：{options.student}")
+
+    c.restoreState()
+
+
+def draw_page_number(c, page_num, page_width):
+    """绘制页码"""
+    c.saveState()
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    c.drawCentredString(page_width / 2, 10 * mm, f"- {page_num} -")
+    c.restoreState()
+
+
+def draw_page(c, page, options, font_name, stroke_manager=None):
+    """按页面计划 (utils.layout.PagePlan) 绘制一页，不调用 showPage"""
+    if page.header:
+        draw_header(c, font_name, options)
+
+    for row in page.rows:
+        # 1. 绘制笔顺 (如果开启)，传入字体用于显示组词
+        if row.stroke_y is not None and stroke_manager is not None:
+            stroke_manager.draw_stroke_order(c, row.char, row.x, row.stroke_y, options.stroke_order_height, font_name)
+
+        # 2. 绘制田字格行
+        draw_tian_grid_row(c, row.x, row.y, options.grid_size, options.grid_count_per_row, options.grid_color)
+
+        # 描红字 (根据配置)
+        draw_char_row(c, row.char, row.x, row.y, font_name, options)
+
+    draw_page_number(c, page.number, options.page_size[0])
+
+
+def render(chars, options=None, sink=None, context=None, workers=1, chunk_pages=None):
+    """
+    渲染练习 PDF
+    :param chars: 要练习的汉字序列
+    :param options: RenderOptions，默认从 config.settings 读取
+    :param sink: 输出目标：文件路径、可写的文件对象 (如 BytesIO)；为 None 时返回 PDF 字节
+    :param context: RenderContext，多次渲染之间共享字体和缓存；为 None 时临时创建
+    :param workers: 大于 1 时把页面分块交给多个进程并行绘制，再用 pypdf 合并
+    :param chunk_pages: 并行绘制时每块的页数，默认按进程数平均分配
+    :return: sink 为 None 时返回 PDF 字节，否则返回 sink
+    """
+    if options is None:
+        options = RenderOptions.from_settings()
+    owns_context = context is None
+    if owns_context:
+        context = RenderContext()
+
+    try:
+        if resolve_font_path(options.font_path) is None:
+            raise RuntimeError(f"找不到字体: {options.font_path}")
+
+        chars = list(chars)
+        if options.show_stroke_order:
+            # 渲染前一次性并发查询所有缺失的组词
+            with metrics.stage('prefetch_words'):
+                context.get_stroke_manager().prefetch_words(chars)
+
+        cache = context.output_cache
+        if cache is not None:
+            with metrics.stage('output_cache'):
+                key = context.render_key(chars, options)
+                cached = cache.get(key)
+            if cached is not None:
+                return _copy_cached(cached, sink)
+            pdf = _render_document(chars, options, None, context, workers, chunk_pages)
+            cache.put(key, pdf)
+            return _write_pdf(pdf, sink)
+        return _render_document(chars, options, sink, context, workers, chunk_pages)
+    finally:
+        if owns_context:
+            context.close()
+
+
+def _render_document(chars, options, sink, context, workers, chunk_pages):
+    """排版并绘制整份文档 (单进程或分页并行)"""
+    # 缓存命中时不需要解析字体，所以在这里才注册
+    if not context.register_font(options.font_path, options.font_subset_ascii):
+        raise RuntimeError(f"无法注册字体: {options.font_path}")
+    with metrics.stage('layout'):
+        pages = layout(chars, options)
+    if workers > 1 and len(pages) > 1 and not HAS_PYPDF:
+        logger.warning("未安装 pypdf，无法合并分块渲染的结果，改为单进程渲染。")
+        workers = 1
+    if workers > 1 and len(pages) > 1:
+        if options.show_stroke_order:
+            # 工作进程从磁盘读取组词缓存
+            context.get_stroke_manager().flush()
+        chunk_pages = chunk_pages or -(-len(pages) // workers)
+        chunks = [pages[i:i + chunk_pages] for i in range(0, len(pages), chunk_pages)]
+        return _render_parallel(chunks, options, sink, min(workers, len(chunks)), context.stroke_spec())
+    return _render_pages(pages, options, sink, context)
+
+
+def _write_pdf(pdf, sink):
+    """把 PDF 字节写到 sink (路径或文件对象)，sink 为 None 时原样返回"""
+    if sink is None:
+        return pdf
+    if isinstance(sink, (str, os.PathLike)):
+        with open(sink, 'wb') as f:
+            f.write(pdf)
+    else:
+        sink.write(pdf)
+    return sink
+
+
+def _copy_cached(cached_path, sink):
+    """把缓存中的 PDF 复制到 sink"""
+    if isinstance(sink, (str, os.PathLike)):
+        shutil.copyfile(cached_path, sink)
+        return sink
+    with open(cached_path, 'rb') as f:
+        return _write_pdf(f.read(), sink)
+
+
+def _render_pages(pages, options, sink, context):
+    """在一个画布上绘制多页，sink 为 None 时返回 PDF 字节"""
+    font_name = context.register_font(options.font_path, options.font_subset_ascii)
+    stroke_manager = context.get_stroke_manager() if options.show_stroke_order else None
+
+    buffer = BytesIO() if sink is None else None
+    c = canvas.Canvas(buffer if buffer is not None else sink, pagesize=options.page_size)
+    c.setTitle(PDF_TITLE)
+    count = 0
+    with metrics.stage('draw'):
+        for count, page in enumerate(pages, 1):
+            if count > 1:
+                c.showPage()
+            draw_page(c, page, options, font_name, stroke_manager)
+    metrics.count('pages', count)
+    with metrics.stage('pdf_write'):
+        c.save()
+
+    if buffer is not None:
+        return buffer.getvalue()
+    return sink
+
+
+def iter_chars(source, chunk_size=65536):
+    """
+    逐块读取文本，逐个产出汉字 (跳过空白)，不把整个输入读入内存
+    :param source: 文件路径，"-" 表示标准输入；也可以是已打开的文本文件对象
+    """
+    if source == '-':
+        f, owns_file = sys.stdin, False
+    elif isinstance(source, str):
+        f, owns_file = open(source, 'r', encoding='utf-8'), True
+    else:
+        f, owns_file = source, False
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            for char in chunk:
+                if not char.isspace():
+                    yield char
+    finally:
+        if owns_file:
+            f.close()
+
+
+def _prefetch_pages(pages, stroke_manager):
+    """逐页产出页面计划，每页绘制前查询该页缺失的组词"""
+    for page in pages:
+        if stroke_manager is not None:
+            stroke_manager.prefetch_words(row.char for row in page.rows)
+        yield page
+
+
+def volume_path(output_path, number):
+    """分卷输出的文件名: hanzi_practice.pdf -> hanzi_practice_001.pdf"""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_{number:03d}{ext or '.pdf'}"
+
+
+def render_stream(chars, options=None, output_path=None, context=None, pages_per_file=50):
+    """
+    流式渲染：从迭代器读取汉字，边排版边绘制，内存占用不随字数增长
+    每排满 pages_per_file 页就保存为一个分卷文件并释放，页码在各分卷间连续
+    pages_per_file 为 0 时全部写入 output_path 一个文件 (文档对象会一直保留到保存，内存随页数增长)
+    :param chars: 汉字迭代器 (如 iter_chars(path))
+    :return: 生成的文件路径列表
+    """
+    if options is None:
+        options = RenderOptions.from_settings()
+    owns_context = context is None
+    if owns_context:
+        context = RenderContext()
+
+    paths = []
+    try:
+        if not context.register_font(options.font_path, options.font_subset_ascii):
+            raise RuntimeError(f"无法注册字体: {options.font_path}")
+        stroke_manager = context.get_stroke_manager() if options.show_stroke_order else None
+
+        pages = iter_pages(chars, options)
+        if not pages_per_file:
+            batches = [_prefetch_pages(pages, stroke_manager)]
+        else:
+            batches = iter(lambda: list(itertools.islice(pages, pages_per_file)), [])
+
+        for number, batch in enumerate(batches, 1):
+            if stroke_manager is not None and pages_per_file:
+                # 每个分卷绘制前并发查询本卷缺失的组词
+                stroke_manager.prefetch_words(row.char for page in batch for row in page.rows)
+            path = volume_path(output_path, number) if pages_per_file else output_path
+            _render_pages(batch, options, path, context)
+            if stroke_manager is not None:
+                stroke_manager.flush()
+            paths.append(path)
+    finally:
+        if owns_context:
+            context.close()
+    return paths
+
+
+# 分块渲染的工作进程内共享的 RenderContext
+_chunk_worker = {}
+
+
+def _init_chunk_worker(stroke_spec=None):
+    context = RenderContext(stroke_spec=stroke_spec)
+    # 进程退出时写回缓存
+    multiprocessing.util.Finalize(context, context.close, exitpriority=10)
+    _chunk_worker['context'] = context
+
+
+def _render_chunk(pages, options):
+    if not _chunk_worker:
+        _init_chunk_worker()
+    return _render_pages(pages, options, None, _chunk_worker['context'])
+
+
+def _render_parallel(chunks, options, sink, workers, stroke_spec=None):
+    """
+    多进程分块渲染，按页序合并为一个 PDF
+    :param stroke_spec: 调用方 RenderContext.stroke_spec()，工作进程按它创建 StrokeManager
+    """
+    with metrics.stage('draw_parallel'):
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_chunk_worker,
+                                 initargs=(stroke_spec,)) as pool:
+            parts = list(pool.map(_render_chunk, chunks, [options] * len(chunks)))
+    metrics.count('pages', sum(len(chunk) for chunk in chunks))
+
+    with metrics.stage('merge'):
+        pypdf = lazy_import('pypdf')
+        writer = pypdf.PdfWriter()
+        for part in parts:
+            writer.append(pypdf.PdfReader(BytesIO(part)))
+        writer.add_metadata({'/Title': PDF_TITLE})
+        # 各块中相同的田字格、笔顺 Form 只保留一份
+        writer.compress_identical_objects()
+
+    buffer = BytesIO() if sink is None else None
+    with metrics.stage('pdf_write'):
+        writer.write(buffer if buffer is not None else sink)
+    if buffer is not None:
+        return buffer.getvalue()
+    return sink
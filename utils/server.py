@@ -0,0 +1,272 @@
+import json
+import time
+import signal
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from config import settings
+from utils.output_cache import OutputCache
+from utils.render import RenderOptions, RenderContext, render, build_options
+from utils.page_image import render_images, IMAGE_FORMATS, CONTENT_TYPES
+
+# 客户端不能修改的选项（避免通过请求读取服务器上的任意文件；页面大小只能在配置中修改）
+FORBIDDEN_OPTIONS = ('font_path', 'page_size')
+# 统计延迟时保留的最近请求数
+LATENCY_WINDOW = 1000
+
+
+class ServiceStats:
+    """请求计数和最近 LATENCY_WINDOW 个请求的耗时"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, nbytes=0, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.bytes_sent += nbytes
+            if not error:
+                self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            result = {
+                'uptime': round(time.time() - self.started, 1),
+                'requests': self.requests,
+                'errors': self.errors,
+                'bytes_sent': self.bytes_sent,
+            }
+        result['latency_ms'] = {
+            name: round(_percentile(latencies, q) * 1000, 1) if latencies else None
+            for name, q in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))
+        }
+        return result
+
+
+def _percentile(sorted_values, q):
+    """最近秩法求百分位数"""
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _hit_rate(hits, total):
+    return round(hits / total, 3) if total else None
+
+
+class WorksheetService:
+    """常驻内存的练习纸生成服务：字体、笔顺数据和组词缓存只加载一次"""
+
+    def __init__(self, max_chars=None):
+        self.max_chars = max_chars or getattr(settings, 'SERVER_MAX_CHARS', 1000)
+        self.base_options = RenderOptions.from_settings(settings)
+        self.output_cache = OutputCache.from_settings(settings)
+        self.context = RenderContext(output_cache=self.output_cache)
+        self.stats = ServiceStats()
+
+    def warm_up(self):
+        """启动时注册字体、打开笔顺索引和组词缓存"""
+        if not self.context.register_font(self.base_options.font_path, self.base_options.font_subset_ascii):
+            raise RuntimeError(f"无法注册字体: {self.base_options.font_path}")
+        self.context.get_stroke_manager().preload()
+
+    def close(self):
+        self.context.close()
+
+    def parse_request(self, params):
+        """从请求参数中取出汉字列表和渲染选项，参数不合法时抛出 ValueError"""
+        params = dict(params)
+        chars = params.pop('chars', None) or ''
+        if not isinstance(chars, str):
+            raise ValueError("chars 必须是字符串")
+        chars = [c for c in chars if c.strip()]
+        if not chars:
+            raise ValueError("缺少要练习的汉字 (chars)")
+        if len(chars) > self.max_chars:
+            raise ValueError(f"汉字数量超过上限 {self.max_chars}")
+        student = params.pop('student', None)
+        if student is not None and not isinstance(student, str):
+            raise ValueError("student 必须是字符串")
+        options = params.pop('options', None) or {}
+        if not isinstance(options, dict):
+            raise ValueError("options 必须是对象")
+        # 其余参数也作为选项 (便于用 GET 查询字符串传递)
+        options.update(params)
+        for key in options:
+            if key.lower() in FORBIDDEN_OPTIONS:
+                raise ValueError(f"不允许修改的选项: {key}")
+        return chars, build_options(self.base_options, options, student)
+
+    def render(self, chars, options):
+        return render(chars, options, context=self.context)
+
+    def preview(self, chars, options, fmt='png', dpi=None, page=1):
+        """只绘制一页为图片 (用于网页上的缩略图)"""
+        dpi = dpi or getattr(settings, 'SERVER_PREVIEW_DPI', 72)
+        images = render_images(chars, options, fmt=fmt, dpi=dpi, context=self.context, pages=[page])
+        if not images:
+            raise ValueError(f"页码超出范围: {page}")
+        return images[0]
+
+    def stats_snapshot(self):
+        result = self.stats.snapshot()
+        stroke_manager = self.context.get_stroke_manager()
+        counts = dict(stroke_manager.stats)
+        strokes_total = sum(counts.get(key, 0) for key in ('paths_hit', 'geometry_hit', 'geometry_miss'))
+        words_total = sum(counts.get(key, 0) for key in ('words_cache', 'words_corpus', 'words_index', 'words_online'))
+        result['cache'] = {
+            'stroke_memory_hit_rate': _hit_rate(counts.get('paths_hit', 0), strokes_total),
+            'stroke_hit_rate': _hit_rate(strokes_total - counts.get('geometry_miss', 0), strokes_total),
+            'words_offline_rate': _hit_rate(words_total - counts.get('words_online', 0), words_total),
+            'output_hit_rate': (_hit_rate(self.output_cache.hits, self.output_cache.hits + self.output_cache.misses)
+                                if self.output_cache is not None else None),
+            'counts': counts,
+            'chars_loaded': len(stroke_manager.char_data),
+            'words_cached': len(stroke_manager.words_cache),
+        }
+        return result
+
+
+class WorksheetRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /render?chars=前后上下&trace_count=3&student=张三
+    POST /render  {"chars": "前后上下", "student": "张三", "options": {"grid_color": "#008000"}}
+    GET  /preview?chars=前后上下&format=png&dpi=72&page=1   (format 可选 png / svg)
+    GET  /stats
+    """
+    server_version = "HanziWorksheet/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/stats':
+            self._send_json(200, self.service.stats_snapshot())
+        elif url.path == '/render':
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._handle_render(params)
+        elif url.path == '/preview':
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._handle_preview(params)
+        else:
+            self._send_json(404, {'error': f"未知路径: {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/render':
+            self._send_json(404, {'error': f"未知路径: {url.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            params = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(params, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+        except ValueError as e:
+            self._send_json(400, {'error': f"请求体不是合法的 JSON: {e}"})
+            return
+        self._handle_render(params)
+
+    def _handle_render(self, params):
+        start = time.perf_counter()
+        try:
+            chars, options = self.service.parse_request(params)
+        except (ValueError, TypeError) as e:
+            self.service.stats.record(time.perf_counter() - start, error=True)
+            self._send_json(400, {'error': str(e)})
+            return
+        try:
+            pdf = self.service.render(chars, options)
+        except Exception as e:
+            self.service.stats.record(time.perf_counter() - start, error=True)
+            self.log_error("生成失败: %s", e)
+            self._send_json(500, {'error': f"生成失败: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(pdf)))
+        self.send_header('Content-Disposition', 'inline; filename="hanzi_practice.pdf"')
+        self.end_headers()
+        self.wfile.write(pdf)
+        self.service.stats.record(time.perf_counter() - start, len(pdf))
+
+    def _handle_preview(self, params):
+        start = time.perf_counter()
+        try:
+            fmt = params.pop('format', 'png').lower()
+            if fmt not in IMAGE_FORMATS:
+                raise ValueError(f"不支持的图片格式: {fmt}")
+            dpi = int(params.pop('dpi', 0)) or None
+            if dpi is not None and not 10 <= dpi <= 300:
+                raise ValueError("dpi 必须在 10 到 300 之间")
+            page = int(params.pop('page', 1))
+            chars, options = self.service.parse_request(params)
+        except (ValueError, TypeError) as e:
+            self.service.stats.record(time.perf_counter() - start, error=True)
+            self._send_json(400, {'error': str(e)})
+            return
+        try:
+            image = self.service.preview(chars, options, fmt, dpi, page)
+        except ValueError as e:
+            self.service.stats.record(time.perf_counter() - start, error=True)
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self.service.stats.record(time.perf_counter() - start, error=True)
+            self.log_error("生成失败: %s", e)
+            self._send_json(500, {'error': f"生成失败: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[fmt])
+        self.send_header('Content-Length', str(len(image)))
+        self.end_headers()
+        self.wfile.write(image)
+        self.service.stats.record(time.perf_counter() - start, len(image))
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(host=None, port=None):
+    """启动服务，直到 Ctrl+C"""
+    host = host or getattr(settings, 'SERVER_HOST', '127.0.0.1')
+    port = port or getattr(settings, 'SERVER_PORT', 8000)
+    service = WorksheetService()
+    print("正在预加载字体、笔顺数据和组词缓存...")
+    service.warm_up()
+
+    httpd = ThreadingHTTPServer((host, port), WorksheetRequestHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    # 被 kill (SIGTERM) 时也要正常退出并写回缓存
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    print(f"练习纸服务已启动: http://{host}:{port}/render?chars=前后上下  (统计: /stats)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+        print("服务已停止，缓存已写回。")
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
@@ -0,0 +1,56 @@
+import sys
+import time
+import importlib
+
+# 启动耗时统计：记录各阶段时间点和延迟导入模块的耗时，供 --startup-report 输出
+
+_START = time.perf_counter()
+_marks = []
+_imports = []
+
+# 启动时不应加载的可选子系统
+OPTIONAL_MODULES = (
+    'reportlab.graphics.shapes',
+    'reportlab.graphics.renderPDF',
+    'svglib',
+    'requests',
+    'jieba',
+    'pypdf',
+    'numpy',
+    'PIL.Image',
+)
+
+
+def mark(label):
+    """记录一个阶段的结束时间点"""
+    _marks.append((label, time.perf_counter()))
+
+
+def lazy_import(name):
+    """在第一次使用时导入模块，并记录导入耗时"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _imports.append((name, time.perf_counter() - start))
+    return module
+
+
+def report(file=None):
+    """打印启动耗时报告"""
+    file = file or sys.stdout
+    print("启动耗时报告 (自 utils.startup 导入起):", file=file)
+    last = _START
+    for label, t in _marks:
+        print(f"  {label:<20} {(t - last) * 1000:8.1f} ms  (累计 {(t - _START) * 1000:8.1f} ms)", file=file)
+        last = t
+    if _imports:
+        print("延迟导入:", file=file)
+        for name, cost in _imports:
+            print(f"  {name:<32} {cost * 1000:8.1f} ms", file=file)
+    loaded = [name for name in OPTIONAL_MODULES if name in sys.modules]
+    skipped = [name for name in OPTIONAL_MODULES if name not in sys.modules]
+    print(f"已加载的可选模块: {', '.join(loaded) or '无'}", file=file)
+    print(f"未加载的可选模块: {', '.join(skipped) or '无'}", file=file)
+    print("如需逐个模块的导入耗时，可使用: python -X importtime create_practice_pdf.py", file=file)
@@ -0,0 +1,152 @@
+import os
+import logging
+import json
+import mmap
+import struct
+import hashlib
+
+logger = logging.getLogger(__name__)
+
+# 索引文件格式 (小端):
+#   文件头: 魔数(4s) 版本(H) 保留(H) 数据文件大小(Q) 数据文件 mtime_ns(Q) 数据 sha1(20s) 记录数(I)
+#   记录:   按码位升序排列的 (码位 I, 偏移 Q, 长度 I)
+# 查询时通过 mmap 二分查找，不需要把整张表读入内存。
+MAGIC = b'HZIX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQ20sI')
+RECORD = struct.Struct('<IQI')
+
+
+def find_record(buf, base, count, char):
+    """在 buf 中从 base 开始的 count 条有序记录里二分查找 char，返回 (偏移, 长度) 或 None"""
+    if len(char) != 1:
+        return None
+    target = ord(char)
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        cp, offset, length = RECORD.unpack_from(buf, base + mid * RECORD.size)
+        if cp < target:
+            lo = mid + 1
+        elif cp > target:
+            hi = mid
+        else:
+            return offset, length
+    return None
+
+
+class StrokeIndexBuilder:
+    """按行增量构建 graphics.txt 的偏移索引"""
+
+    def __init__(self):
+        self.records = {}
+        self.offset = 0
+        self.sha1 = hashlib.sha1()
+        # feed_bytes 中尚未遇到换行符的部分
+        self._pending = b''
+
+    def feed(self, line):
+        """喂入一行原始字节（包含换行符）"""
+        self.sha1.update(line)
+        if line.strip():
+            try:
+                entry = json.loads(line)
+                char = entry['character']
+                if len(char) == 1:
+                    self.records[ord(char)] = (self.offset, len(line))
+            except (ValueError, KeyError, TypeError):
+                pass
+        self.offset += len(line)
+
+    def feed_bytes(self, chunk):
+        """喂入任意切分的字节块 (如边下载边建索引)，不完整的最后一行留到下一块"""
+        data = self._pending + chunk
+        start = 0
+        while True:
+            end = data.find(b'\n', start)
+            if end < 0:
+                break
+            self.feed(data[start:end + 1])
+            start = end + 1
+        self._pending = data[start:]
+
+    def finish(self):
+        """处理 feed_bytes 留下的最后一行 (文件不以换行符结尾时)"""
+        if self._pending:
+            self.feed(self._pending)
+            self._pending = b''
+
+    def write(self, index_file, data_size, data_mtime_ns):
+        """将索引原子写入 index_file"""
+        tmp_file = f"{index_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, data_size, data_mtime_ns,
+                                self.sha1.digest(), len(self.records)))
+            for cp in sorted(self.records):
+                offset, length = self.records[cp]
+                f.write(RECORD.pack(cp, offset, length))
+        os.replace(tmp_file, index_file)
+
+
+class StrokeIndex:
+    """graphics.txt 的只读偏移索引，按需 seek 读取单个汉字的数据"""
+
+    def __init__(self, data_file, index_file):
+        self.data_file = data_file
+        self.index_file = index_file
+        self._mm = None
+        self._count = 0
+        self.data_hash = None
+
+    @staticmethod
+    def build(data_file, index_file):
+        """扫描一遍数据文件并生成索引"""
+        builder = StrokeIndexBuilder()
+        with open(data_file, 'rb') as f:
+            for line in f:
+                builder.feed(line)
+        st = os.stat(data_file)
+        builder.write(index_file, st.st_size, st.st_mtime_ns)
+        return len(builder.records)
+
+    def is_fresh(self):
+        """索引存在且与数据文件的大小、修改时间一致"""
+        try:
+            st = os.stat(self.data_file)
+            with open(self.index_file, 'rb') as f:
+                header = f.read(HEADER.size)
+        except OSError:
+            return False
+        if len(header) < HEADER.size:
+            return False
+        magic, version, _, size, mtime_ns, _, _ = HEADER.unpack(header)
+        return (magic == MAGIC and version == VERSION
+                and size == st.st_size and mtime_ns == st.st_mtime_ns)
+
+    def open(self):
+        """打开索引，必要时先重建；返回收录的汉字数量"""
+        if not self.is_fresh():
+            logger.info("正在生成笔顺数据索引...")
+            self.build(self.data_file, self.index_file)
+        with open(self.index_file, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, _, _, digest, self._count = HEADER.unpack_from(self._mm, 0)
+        self.data_hash = digest.hex()
+        return self._count
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, char):
+        return self.lookup(char) is not None
+
+    def lookup(self, char):
+        """返回 (偏移, 长度)，不存在时返回 None"""
+        if self._mm is None:
+            return None
+        return find_record(self._mm, HEADER.size, self._count, char)
@@ -1,14 +1,15 @@
 import os
+import logging
 import json
-import requests
-from reportlab.graphics import renderPDF
-from svglib.svglib import svg2rlg
 from reportlab.lib.units import mm
 from io import BytesIO
 import sys
-from reportlab.graphics.shapes import Drawing, Group
 from reportlab.lib import colors
+from reportlab.pdfgen.canvas import FILL_NON_ZERO
+from reportlab.pdfgen.pathobject import PDFPathObject
 import time
+import threading
+from collections import Counter
 
 # 尝试导入配置
 try:
@@ -18,82 +19,198 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     import config.settings as settings
 
-# 尝试导入 jieba
-try:
-    import jieba
-    HAS_JIEBA = True
-except ImportError:
-    HAS_JIEBA = False
+from utils.stroke_index import StrokeIndex, StrokeIndexBuilder
+from utils.download import download_file
+from utils.svg_path import StrokeOutline, geometry_to_shape
+from utils.geometry_cache import GeometryCache
+from utils.words_cache import WordsCache
+from utils.words_index import WordsIndex
+from utils.lru import LRUCache
+from utils.startup import lazy_import
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# requests、reportlab.graphics、svglib 等较重的模块都在第一次用到时才导入
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 
 class StrokeManager:
-    def __init__(self):
-        self.data_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'graphics.txt')
-        self.data_url = "https://raw.githubusercontent.com/skishore/makemeahanzi/master/graphics.txt"
-        self.char_data = {}
+    def __init__(self, renderer=None, data_dir=None):
+        """
+        :param renderer: 笔画路径转换方式: "native" 使用内置解析器，"svglib" 使用 svglib（便于对比）
+        :param data_dir: 笔顺数据、索引和各类缓存所在目录，默认为项目的 data 目录
+        """
+        self.renderer = renderer or getattr(settings, 'STROKE_RENDERER', 'native')
+        data_dir = data_dir or DEFAULT_DATA_DIR
+        self.data_dir = data_dir
+        self.data_file = os.path.join(data_dir, 'graphics.txt')
+        self.data_url = getattr(settings, 'STROKE_DATA_URL', None) or "https://raw.githubusercontent.com/skishore/makemeahanzi/master/graphics.txt"
+        # 偏移索引：只在需要时读取单个汉字的数据
+        self.index_file = os.path.join(data_dir, 'graphics.idx')
+        self.index = StrokeIndex(self.data_file, self.index_file)
+        self._data_fp = None
+        # 内存中最多保留多少个汉字的笔顺数据和路径对象 (超出时淘汰最久未用的字，保证长文档内存不随字数增长)
+        memory_cache_size = getattr(settings, 'STROKE_MEMORY_CACHE_SIZE', 1000)
+        # 已解析的笔画轮廓 (StrokeOutline，紧凑数组，不含 medians 等用不到的数据；仅包含最近用到的字)
+        self.char_data = LRUCache(memory_cache_size)
+        # 笔顺几何数据的持久化缓存（仅内置解析器使用），在索引加载后打开
+        self.geometry_cache_file = os.path.join(data_dir, '.stroke_cache.sqlite')
+        self.geometry_cache = None
+        # 笔顺 Form 名称 -> 宽度
+        self._form_widths = {}
+        # (汉字, 高度) -> 每个笔画的 PDF 路径对象，与画布无关，可在多个文档间复用
+        self._stroke_paths = LRUCache(memory_cache_size)
         # 使用缓存文件来存储已查询过的组词，减少重复查询
-        self.cache_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '.words_cache.json')
-        self.words_cache = {}
+        self.cache_file = os.path.join(data_dir, '.words_cache.json')
+        self.words_cache = WordsCache(self.cache_file, getattr(settings, 'WORDS_CACHE_FLUSH_INTERVAL', 30))
         # 本地词库
-        self.corpus_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'words_corpus.json')
+        self.corpus_file = os.path.join(data_dir, 'words_corpus.json')
         self.words_corpus = {}
-        self._load_data()
-        self._load_cache()
-        self._load_corpus()
-        
-        # 初始化 jieba
-        if HAS_JIEBA:
-            jieba.initialize()
-            print("jieba 词库已加载")
+        # 离线组词索引 (由 utils/words_index.py 生成)
+        self.words_index_file = os.path.join(data_dir, 'words_index.bin')
+        self.words_index = WordsIndex(self.words_index_file)
+        # 组词在线接口客户端，第一次查询时创建
+        self.words_client = None
+        # 笔顺数据和组词数据都在第一次使用时才加载
+        self._data_loaded = False
+        self._words_loaded = False
+        # 同一个 StrokeManager 可被多个线程同时用于渲染：数据文件读取、缓存读写都在锁内进行
+        # (在线查询组词不持有锁)
+        self._lock = threading.RLock()
+        # 命中统计: paths_hit (内存), geometry_hit/geometry_miss (几何缓存), words_cache/words_corpus/words_index/words_online
+        # 以及 strokes_parsed (解析的笔画数)、words_prefetched (渲染前批量在线查询的汉字数)
+        self.stats = Counter()
+
+    def _ensure_data(self):
+        """第一次需要笔顺数据时加载索引"""
+        if self._data_loaded:
+            return
+        with self._lock:
+            if not self._data_loaded:
+                with metrics.stage('load_strokes'):
+                    self._load_data()
+                self._data_loaded = True
 
+    def _ensure_words(self):
+        """第一次需要组词时加载缓存、本地词库和离线索引"""
+        if self._words_loaded:
+            return
+        with self._lock:
+            if not self._words_loaded:
+                with metrics.stage('load_words'):
+                    self._load_cache()
+                    self._load_corpus()
+                    self._load_words_index()
+                self._words_loaded = True
 
     def _load_data(self):
         """加载数据，如果不存在则下载"""
-        if not os.path.exists(self.data_file):
-            print(f"笔顺数据文件不存在，正在下载... ({self.data_url})")
+        if not os.path.exists(self.data_file) and not self._download_data():
+            return
+
+        logger.info("正在加载笔顺数据索引...")
+        try:
+            count = self.index.open()
+            self._data_fp = open(self.data_file, 'rb')
+            logger.info(f"加载完成，共 {count} 个汉字数据。")
+        except Exception as e:
+            logger.error(f"加载数据失败: {e}")
+            return
+
+        max_bytes = getattr(settings, 'STROKE_CACHE_MAX_SIZE', 0)
+        if max_bytes:
             try:
-                proxies = None
-                if hasattr(settings, 'PROXY_URL') and settings.PROXY_URL:
-                    proxies = {
-                        'http': settings.PROXY_URL,
-                        'https': settings.PROXY_URL
-                    }
-                    print(f"使用代理: {settings.PROXY_URL}")
-                
-                response = requests.get(self.data_url, proxies=proxies)
-                response.raise_for_status()
-                with open(self.data_file, 'wb') as f:
-                    f.write(response.content)
-                print("下载完成！")
+                cache = GeometryCache(self.geometry_cache_file, self.index.data_hash, max_bytes)
+                cache.open()
+                self.geometry_cache = cache
             except Exception as e:
-                print(f"下载失败: {e}")
-                print("请检查网络连接或手动下载 graphics.txt 到 data 目录。")
-                return
+                logger.warning(f"打开笔顺缓存失败: {e}")
+
+    def _download_data(self):
+        """下载笔顺数据 (可断点续传，校验后才替换)，同时生成索引；成功返回 True"""
+        logger.info(f"笔顺数据文件不存在，正在下载... ({self.data_url})")
+        proxies = None
+        if getattr(settings, 'PROXY_URL', None):
+            proxies = {
+                'http': settings.PROXY_URL,
+                'https': settings.PROXY_URL
+            }
+            logger.info(f"使用代理: {settings.PROXY_URL}")
+
+        # 边下载边建索引，下载完成后不必再扫描一遍文件
+        builder = None
+
+        def index_chunk(offset, chunk):
+            nonlocal builder
+            if offset == 0:
+                builder = StrokeIndexBuilder()
+            builder.feed_bytes(chunk)
 
-        print("正在加载笔顺数据...")
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line)
-                        self.char_data[entry['character']] = entry
-                    except json.JSONDecodeError:
-                        continue
-            print(f"加载完成，共 {len(self.char_data)} 个汉字数据。")
+            download_file(self.data_url, self.data_file,
+                          sha256=getattr(settings, 'STROKE_DATA_SHA256', None),
+                          proxies=proxies, on_data=index_chunk)
         except Exception as e:
-            print(f"加载数据失败: {e}")
+            logger.error(f"下载失败: {e}")
+            logger.error("请检查网络连接或手动下载 graphics.txt 到 data 目录。")
+            return False
 
-    def _load_cache(self):
-        """加载或创建组词缓存"""
-        if os.path.exists(self.cache_file):
+        if builder is not None:
+            builder.finish()
+            st = os.stat(self.data_file)
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    self.words_cache = json.load(f)
-                print(f"加载缓存数据完成，共 {len(self.words_cache)} 个汉字。")
-            except Exception as e:
-                print(f"加载缓存失败: {e}")
-                self.words_cache = {}
-        else:
-            self.words_cache = {}
+                builder.write(self.index_file, st.st_size, st.st_mtime_ns)
+            except OSError as e:
+                logger.warning(f"保存笔顺数据索引失败: {e}")
+        return True
+
+    def data_version(self):
+        """笔顺数据文件的哈希，用于判断缓存是否过期；数据不可用时返回 None"""
+        self._ensure_data()
+        if self._data_fp is None:
+            return None
+        return self.index.data_hash
+
+    def preload(self):
+        """提前加载笔顺数据和组词数据（默认在第一次使用时才加载）"""
+        self._ensure_data()
+        self._ensure_words()
+
+    def flush(self):
+        """把新查询到的组词写入缓存日志"""
+        if self._words_loaded:
+            with self._lock:
+                try:
+                    self.words_cache.flush()
+                except OSError:
+                    pass  # 缓存保存失败不影响主流程
+
+    def close(self):
+        """释放数据文件并写回缓存"""
+        with self._lock:
+            if self._words_loaded:
+                self._save_cache()
+            if self.words_client is not None:
+                self.words_client.close()
+                self.words_client = None
+            if self.geometry_cache is not None:
+                self.geometry_cache.close()
+                self.geometry_cache = None
+            if self._data_fp is not None:
+                self._data_fp.close()
+                self._data_fp = None
+            self.index.close()
+            self.words_index.close()
+
+    def _load_cache(self):
+        """加载组词缓存（快照 + 追加日志）"""
+        try:
+            count = self.words_cache.load()
+            if count:
+                logger.info(f"加载缓存数据完成，共 {count} 个汉字。")
+        except Exception as e:
+            logger.warning(f"加载缓存失败: {e}")
 
     def _load_corpus(self):
         """加载本地词库"""
@@ -101,134 +218,346 @@ class StrokeManager:
             try:
                 with open(self.corpus_file, 'r', encoding='utf-8') as f:
                     self.words_corpus = json.load(f)
-                print(f"加载本地词库完成，共 {len(self.words_corpus)} 个汉字。")
+                logger.info(f"加载本地词库完成，共 {len(self.words_corpus)} 个汉字。")
             except Exception as e:
-                print(f"加载本地词库失败: {e}")
+                logger.warning(f"加载本地词库失败: {e}")
                 self.words_corpus = {}
         else:
             self.words_corpus = {}
 
+    def _load_words_index(self):
+        """打开离线组词索引（不存在时跳过）"""
+        try:
+            count = self.words_index.open()
+            if count:
+                logger.info(f"加载离线组词索引完成，共 {count} 个汉字。")
+        except Exception as e:
+            logger.warning(f"加载离线组词索引失败: {e}")
+
     def _save_cache(self):
-        """保存组词缓存"""
+        """写回组词缓存"""
         try:
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.words_cache, f, ensure_ascii=False, indent=2)
+            self.words_cache.close()
         except Exception as e:
             pass  # 缓存保存失败不影响主流程
 
+    def _read_entry(self, char):
+        """根据索引从数据文件中读取单个汉字的条目"""
+        self._ensure_data()
+        with self._lock:
+            if self._data_fp is None:
+                return None
+            loc = self.index.lookup(char)
+            if loc is None:
+                return None
+            offset, length = loc
+            self._data_fp.seek(offset)
+            raw = self._data_fp.read(length)
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+
     def get_strokes(self, char):
-        """获取汉字的笔画路径列表"""
-        if char in self.char_data:
-            return self.char_data[char]['strokes']
-        return None
+        """获取汉字的笔画路径列表 (SVG 路径字符串，每次从数据文件读取)"""
+        entry = self._read_entry(char)
+        if entry is None:
+            return None
+        return entry['strokes']
+
+    def get_outline(self, char):
+        """获取汉字已解析的笔画轮廓 (StrokeOutline)，没有数据时返回 None"""
+        with self._lock:
+            outline = self.char_data.get(char)
+        if outline is not None:
+            return outline
+
+        strokes = self.get_strokes(char)
+        if not strokes:
+            return None
+
+        logger.debug("Parsing strokes for %s", char)
+        errors = []
+        with metrics.stage('stroke_parse'):
+            outline = StrokeOutline.from_paths(strokes, errors)
+        for e in errors:
+            logger.warning(f"Error parsing SVG for {char}: {e}")
+
+        with self._lock:
+            self.stats['strokes_parsed'] += len(outline)
+            self.char_data[char] = outline
+        return outline
 
     def get_words(self, char):
         """获取汉字的相关组词（2-3个）
         
-        优先级：缓存 > 本地词库 > 在线接口
+        优先级：缓存 > 本地词库 > 离线组词索引 > 在线接口
         """
-        # 1. 检查缓存
-        if char in self.words_cache:
-            return self.words_cache[char]
-        
-        # 2. 检查本地词库
-        if char in self.words_corpus:
-            words = self.words_corpus[char]
-            self.words_cache[char] = words
-            self._save_cache()
-            return words
+        self._ensure_words()
+
+        with self._lock:
+            # 1. 检查缓存
+            if char in self.words_cache:
+                self.stats['words_cache'] += 1
+                return self.words_cache[char]
+
+            # 2. 检查本地词库
+            if char in self.words_corpus:
+                self.stats['words_corpus'] += 1
+                words = self.words_corpus[char]
+                self.words_cache.set(char, words)
+                return words
         
-        # 3. 尝试在线接口
-        words = self._query_words_from_ownthink(char)
+        # 3. 检查离线组词索引
+        words = self.words_index.lookup(char)
+        if words:
+            with self._lock:
+                self.stats['words_index'] += 1
+            return words[:3]
+
+        # 4. 尝试在线接口
+        with metrics.stage('words_online'):
+            words = self._query_words_from_ownthink(char)
         
-        # 保存到缓存
-        self.words_cache[char] = words
-        self._save_cache()
+        # 保存到缓存（延迟写盘，close 时统一写回）
+        with self._lock:
+            self.stats['words_online'] += 1
+            self.words_cache.set(char, words)
         
         return words
 
+    def known_words(self, chars):
+        """
+        不访问网络，读取有笔顺数据的字已知的组词 (用于计算生成结果的缓存键，不计入命中统计)
+        没有笔顺数据的字不包含在结果中；缓存、本地词库和离线索引中都没有组词的字对应 None
+        :return: {汉字: 组词列表}
+        """
+        self._ensure_data()
+        self._ensure_words()
+        words = {}
+        with self._lock:
+            chars = [char for char in dict.fromkeys(chars) if self.index.lookup(char) is not None]
+            for char in chars:
+                if char in self.words_cache:
+                    words[char] = self.words_cache[char]
+                elif char in self.words_corpus:
+                    words[char] = self.words_corpus[char]
+        for char in chars:
+            if char not in words:
+                found = self.words_index.lookup(char)
+                words[char] = found[:3] if found else None
+        return words
+
+    def prefetch_words(self, chars):
+        """
+        在渲染前并发查询所有缺失的组词，避免在绘制过程中逐个等待网络
+        没有笔顺数据的字 (标点、英文字母等) 不绘制笔顺行，也不显示组词，不查询
+        :param chars: 汉字列表
+        """
+        self._ensure_data()
+        self._ensure_words()
+        with self._lock:
+            missing = [char for char in dict.fromkeys(chars)
+                       if self.index.lookup(char) is not None
+                       and char not in self.words_cache and char not in self.words_corpus
+                       and char not in self.words_index]
+        if not missing:
+            return
+
+        logger.info(f"正在查询 {len(missing)} 个汉字的组词...")
+        start = time.perf_counter()
+        with metrics.stage('words_online'):
+            results = self._get_words_client().query_many(missing)
+        with self._lock:
+            self.stats['words_prefetched'] += len(missing)
+            for char, words in results.items():
+                self.words_cache.set(char, words)
+        logger.info(f"组词查询完成，耗时 {time.perf_counter() - start:.1f} 秒。")
+
+    def _get_words_client(self):
+        with self._lock:
+            if self.words_client is None:
+                WordsClient = lazy_import('utils.word_api').WordsClient
+                self.words_client = WordsClient(
+                    getattr(settings, 'WORDS_API_URL', "https://api.ownthink.com/kg/knowledge"),
+                    rate=getattr(settings, 'WORDS_API_RATE', 5),
+                    workers=getattr(settings, 'WORDS_API_WORKERS', 4),
+                )
+            return self.words_client
+
     def _query_words_from_ownthink(self, char):
-        """从 Ownthink API 查询（降频处理）"""
-        try:
-            time.sleep(0.5)  # 降频
-            
-            url = f"https://api.ownthink.com/kg/knowledge?entity={char}"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('message') == 'success':
-                    # 从返回数据中提取可能的词汇
-                    words = []
-                    avp = data.get('data', {}).get('avp', [])
-                    
-                    for item in avp:
-                        if isinstance(item, list) and len(item) >= 2:
-                            value = item[1]
-                            if isinstance(value, str) and '、' in value:
-                                # 如果值中包含顿号，可能是多个词汇
-                                candidates = value.split('、')
-                                for cand in candidates:
-                                    cand = cand.strip()
-                                    if char in cand and 2 <= len(cand) <= 4 and cand not in words:
-                                        words.append(cand)
-                                        if len(words) >= 3:
-                                            return words
-                    
-                    return words
-        except:
-            pass
-        
-        return []
+        """从 Ownthink API 查询（限流处理）"""
+        return self._get_words_client().query(char)
 
     def get_stroke_drawings(self, char, size=100):
         """
         获取汉字的分步笔顺 Drawing 对象列表
         """
-        strokes = self.get_strokes(char)
-        if not strokes:
+        shapes_module = lazy_import('reportlab.graphics.shapes')
+        shapes = self._get_stroke_shapes(char, size)
+        if not shapes:
             return []
 
         drawings = []
-        current_paths = []
-        
-        print(f"Generating strokes for {char}, size={size}")
+        # 已完成笔画的图形，第 k 步复用前 k-1 步的图形再加上新的一笔
+        current_shapes = []
+        for shape in shapes:
+            current_shapes.append(shape)
+
+            # 创建一个新的 Drawing 作为容器，共享之前笔画的图形对象
+            d = shapes_module.Drawing(size, size)
+            d.add(shapes_module.Group(*current_shapes))
+            drawings.append(d)
 
-        for stroke in strokes:
-            current_paths.append(stroke)
-            
-            # 构建 SVG
-            # MakeMeAHanzi 数据通常需要垂直翻转
-            svg_content = f'''
-            <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1024 1024">
-                <g transform="scale(1, -1) translate(0, -900)">
-                    {''.join([f'<path d="{p}" fill="black" />' for p in current_paths])}
-                </g>
-            </svg>
-            '''
-            
-            try:
-                rlg_drawing = svg2rlg(BytesIO(svg_content.encode('utf-8')))
-                if rlg_drawing:
-                    # 创建一个新的 Drawing 作为容器
-                    d = Drawing(size, size)
-                    
-                    # 计算缩放比例
-                    scale_factor = size / 1024.0
-                    
-                    # 将原始内容放入 Group 并缩放
-                    # 注意：rlg_drawing.contents 是一个列表，通常包含一个 Group
-                    g = Group(*rlg_drawing.contents)
-                    g.scale(scale_factor, scale_factor)
-                    
-                    d.add(g)
-                    drawings.append(d)
-            except Exception as e:
-                print(f"Error parsing SVG for {char}: {e}")
-                
         return drawings
 
+    def get_stroke_geometry(self, char, size):
+        """
+        获取每个笔画已缩放到 size 的 (points, operators)，优先使用持久化缓存
+        仅用于内置解析器
+        """
+        self._ensure_data()
+        with self._lock:
+            if self.geometry_cache is not None:
+                geometry = self.geometry_cache.get(char, size)
+                if geometry is not None:
+                    self.stats['geometry_hit'] += 1
+                    return geometry
+            self.stats['geometry_miss'] += 1
+
+        outline = self.get_outline(char)
+        if not outline:
+            return []
+
+        logger.debug("Generating strokes for %s, size=%s", char, size)
+        with metrics.stage('stroke_transform'):
+            geometry = outline.scaled(size)
+
+        with self._lock:
+            if self.geometry_cache is not None and geometry:
+                self.geometry_cache.put(char, size, geometry)
+        return geometry
+
+    def _get_stroke_shapes(self, char, size):
+        """获取每个笔画已缩放到 size 的 ReportLab 图形"""
+        if self.renderer != 'svglib':
+            return [geometry_to_shape(points, operators)
+                    for points, operators in self.get_stroke_geometry(char, size)]
+
+        strokes = self.get_strokes(char)
+        if not strokes:
+            return []
+
+        logger.debug("Generating strokes for %s, size=%s", char, size)
+
+        shapes = []
+        with metrics.stage('stroke_parse'):
+            for stroke in strokes:
+                try:
+                    shape = self._stroke_to_shape_svglib(stroke, size)
+                except Exception as e:
+                    logger.warning(f"Error parsing SVG for {char}: {e}")
+                    continue
+                if shape is not None:
+                    shapes.append(shape)
+        with self._lock:
+            self.stats['strokes_parsed'] += len(shapes)
+        return shapes
+
+    def _stroke_to_shape_svglib(self, path, size):
+        """通过 svglib 解析笔画路径"""
+        from svglib.svglib import svg2rlg
+
+        # MakeMeAHanzi 数据通常需要垂直翻转
+        svg_content = f'''
+        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1024 1024">
+            <g transform="scale(1, -1) translate(0, -900)">
+                <path d="{path}" fill="black" />
+            </g>
+        </svg>
+        '''
+        rlg_drawing = svg2rlg(BytesIO(svg_content.encode('utf-8')))
+        if not rlg_drawing:
+            return None
+        # 注意：rlg_drawing.contents 是一个列表，通常包含一个 Group
+        scale_factor = size / 1024.0
+        g = lazy_import('reportlab.graphics.shapes').Group(*rlg_drawing.contents)
+        g.scale(scale_factor, scale_factor)
+        return g
+
+    @staticmethod
+    def _stroke_form_name(char, height):
+        """笔顺 Form 的名称（需为合法的 PDF 名称）"""
+        return f"Strokes_{ord(char):X}_{int(round(height * 100))}"
+
+    @staticmethod
+    def _build_stroke_form(c, form_name, drawings, height):
+        """把分步笔顺 Drawing 绘制为一个 Form XObject，返回其占用的宽度"""
+        renderPDF = lazy_import('reportlab.graphics.renderPDF')
+        spacing = height * 0.2 # 间距为高度的 20%
+        width = len(drawings) * (height + spacing)
+        c.beginForm(form_name, lowerx=0, lowery=0, upperx=width, uppery=height)
+        current_x = 0
+        for drawing in drawings:
+            # ReportLab 的 Drawing 绘制时，(0,0) 是左下角
+            renderPDF.draw(drawing, c, current_x, 0)
+            current_x += height + spacing
+        c.endForm()
+        return width
+
+    def get_stroke_paths(self, char, height):
+        """获取每个笔画的 PDF 路径对象（在内存中缓存，常驻服务中重复生成同一个字时不再格式化坐标）"""
+        key = (char, height)
+        with self._lock:
+            paths = self._stroke_paths.get(key)
+            if paths is not None:
+                self.stats['paths_hit'] += 1
+                return paths
+
+        paths = []
+        for points, operators in self.get_stroke_geometry(char, height):
+            p = PDFPathObject()
+            i = 0
+            for op in operators:
+                if op == 0:
+                    p.moveTo(points[i], points[i + 1])
+                    i += 2
+                elif op == 1:
+                    p.lineTo(points[i], points[i + 1])
+                    i += 2
+                elif op == 2:
+                    p.curveTo(*points[i:i + 6])
+                    i += 6
+                else:
+                    p.close()
+            paths.append(p)
+        if paths:
+            with self._lock:
+                self._stroke_paths[key] = paths
+        return paths
+
+    @staticmethod
+    def _build_stroke_form_from_paths(c, form_name, paths, height):
+        """
+        直接用画布路径把分步笔顺绘制为 Form XObject，返回其占用的宽度
+        不经过 reportlab.graphics，缓存命中时无需导入它
+        """
+        spacing = height * 0.2 # 间距为高度的 20%
+        width = len(paths) * (height + spacing)
+
+        # 每个笔画只构建一次路径对象，各步骤重复引用
+        c.beginForm(form_name, lowerx=0, lowery=0, upperx=width, uppery=height)
+        c.setFillColor(colors.black)
+        for step in range(len(paths)):
+            c.saveState()
+            c.translate(step * (height + spacing), 0)
+            # 每个笔画单独填充 (非零环绕)，避免重叠部分互相抵消
+            for p in paths[:step + 1]:
+                c.drawPath(p, stroke=0, fill=1, fillMode=FILL_NON_ZERO)
+            c.restoreState()
+        c.endForm()
+        return width
+
     def draw_stroke_order(self, c, char, x, y, height, font_name=None):
         """
         在 Canvas 上绘制汉字的笔顺序列和相关组词
@@ -239,18 +568,26 @@ class StrokeManager:
         :param height: 笔顺行高度
         :param font_name: 中文字体名称（用于显示组词）
         """
-        drawings = self.get_stroke_drawings(char, size=height)
-        if not drawings:
-            return
+        # 同一个字的笔顺序列在文档中只绘制一次（Form XObject），之后按引用放置
+        form_name = self._stroke_form_name(char, height)
+        if not c.hasForm(form_name):
+            if self.renderer == 'svglib':
+                drawings = self.get_stroke_drawings(char, size=height)
+                if not drawings:
+                    return
+                width = self._build_stroke_form(c, form_name, drawings, height)
+            else:
+                paths = self.get_stroke_paths(char, height)
+                if not paths:
+                    return
+                width = self._build_stroke_form_from_paths(c, form_name, paths, height)
+            self._form_widths[form_name] = width
 
-        # 绘制每一个步骤
-        current_x = x
-        spacing = height * 0.2 # 间距为高度的 20%
-        
-        for drawing in drawings:
-            # ReportLab 的 Drawing 绘制时，(0,0) 是左下角
-            renderPDF.draw(drawing, c, current_x, y)
-            current_x += height + spacing
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(form_name)
+        c.restoreState()
+        current_x = x + self._form_widths[form_name]
 
         # 绘制组词（如果有）
         words = self.get_words(char)
@@ -278,7 +615,16 @@ class StrokeManager:
             c.restoreState()
 
 if __name__ == "__main__":
-    # 测试
+    # 测试：对比内置解析器与 svglib 的输出和耗时
     sm = StrokeManager()
-    drawings = sm.get_stroke_drawings("我")
-    print(f"生成的笔顺图数量: {len(drawings)}")
+    test_chars = sys.argv[1] if len(sys.argv) > 1 else "我"
+    # 先导入两种实现共用的模块，避免计入第一种的耗时
+    lazy_import('reportlab.graphics.shapes')
+    for renderer in ('native', 'svglib'):
+        sm.renderer = renderer
+        start = time.perf_counter()
+        results = [sm.get_stroke_drawings(ch) for ch in test_chars]
+        elapsed = time.perf_counter() - start
+        bounds = [d[-1].getBounds() if d else None for d in results]
+        print(f"[{renderer}] 耗时 {elapsed * 1000:.1f} ms, 笔顺图数量: {[len(d) for d in results]}")
+        print(f"[{renderer}] 最终笔画边界: {bounds}")
@@ -0,0 +1,163 @@
+import re
+import importlib.util
+from array import array
+
+from reportlab.lib import colors
+
+from utils.startup import lazy_import
+
+# NumPy 为可选依赖，只在第一次缩放笔画时导入
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+# MakeMeAHanzi 笔画坐标系: 1024x1024，y 轴向上，基线在 y=900 往下 1024 处 (即 y 范围 -124 ~ 900)
+# svglib 会把 SVG 的 px 按 0.75 换算成 pt，这里保持相同的比例，保证两种实现的输出一致
+SVG_PX_TO_PT = 0.75
+VIEWBOX_SIZE = 1024.0
+Y_OFFSET = 124.0
+
+# 每个命令需要的参数个数
+_ARG_COUNT = {'M': 2, 'L': 2, 'Q': 4, 'C': 6, 'Z': 0}
+
+_TOKEN_RE = re.compile(r'[MLQCZmlqcz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+_MOVETO, _LINETO, _CURVETO, _CLOSEPATH = 0, 1, 2, 3
+
+
+def parse_path(d):
+    """
+    将 SVG 路径字符串解析为 [(命令, [参数...]), ...]
+    只支持 MakeMeAHanzi 用到的绝对坐标命令 M/L/Q/C/Z，遇到其他命令抛出 ValueError
+    """
+    tokens = _TOKEN_RE.findall(d)
+    commands = []
+    i = 0
+    cmd = None
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok.isalpha():
+            cmd = tok
+            if cmd not in _ARG_COUNT:
+                raise ValueError(f"不支持的路径命令: {cmd}")
+            i += 1
+            if cmd == 'Z':
+                commands.append(('Z', []))
+                continue
+        elif cmd is None or cmd == 'Z':
+            raise ValueError(f"路径格式错误: {d[:40]}")
+        n = _ARG_COUNT[cmd]
+        args = tokens[i:i + n]
+        if len(args) < n:
+            raise ValueError(f"路径参数不足: {d[:40]}")
+        commands.append((cmd, [float(a) for a in args]))
+        i += n
+        # M 之后隐式重复的坐标按 L 处理
+        if cmd == 'M':
+            cmd = 'L'
+    return commands
+
+
+def _outline_stroke(d):
+    """
+    将笔画路径转换为操作码和未缩放的坐标 (二次贝塞尔已转换为三次，y 已平移到 0 ~ 1024)
+    :return: (operators, coords)
+    """
+    coords = []
+    operators = []
+    # 当前点 (原始坐标)，二次贝塞尔转三次时需要
+    cx = cy = 0.0
+    for cmd, args in parse_path(d):
+        if cmd == 'M' or cmd == 'L':
+            cx, cy = args
+            coords.extend((cx, cy + Y_OFFSET))
+            operators.append(_MOVETO if cmd == 'M' else _LINETO)
+        elif cmd == 'Q':
+            qx, qy, x, y = args
+            # 二次贝塞尔曲线等价转换为三次
+            coords.extend((
+                cx + 2.0 / 3.0 * (qx - cx), cy + 2.0 / 3.0 * (qy - cy) + Y_OFFSET,
+                x + 2.0 / 3.0 * (qx - x), y + 2.0 / 3.0 * (qy - y) + Y_OFFSET,
+                x, y + Y_OFFSET,
+            ))
+            operators.append(_CURVETO)
+            cx, cy = x, y
+        elif cmd == 'C':
+            x1, y1, x2, y2, x, y = args
+            coords.extend((x1, y1 + Y_OFFSET, x2, y2 + Y_OFFSET, x, y + Y_OFFSET))
+            operators.append(_CURVETO)
+            cx, cy = x, y
+        else:
+            operators.append(_CLOSEPATH)
+    return operators, coords
+
+
+def _scale_factor(size):
+    return size / VIEWBOX_SIZE * SVG_PX_TO_PT
+
+
+class StrokeOutline:
+    """
+    一个汉字全部笔画的紧凑表示：操作码 (uint8) 和坐标 (float32) 各存为一个连续数组，
+    另记录每个笔画的结束位置。路径只解析一次，缩放到任意尺寸只需对整个坐标数组做一次乘法
+    """
+    __slots__ = ('codes', 'coords', 'code_ends', 'coord_ends')
+
+    def __init__(self, codes, coords, code_ends, coord_ends):
+        self.codes = codes            # bytes，每个操作一个字节
+        self.coords = coords          # array('f')，未缩放的坐标
+        self.code_ends = code_ends    # 每个笔画在 codes 中的结束位置
+        self.coord_ends = coord_ends  # 每个笔画在 coords 中的结束位置
+
+    @classmethod
+    def from_paths(cls, paths, errors=None):
+        """
+        解析一个汉字的全部笔画路径
+        :param errors: 为列表时，无法解析的笔画被跳过，异常追加到该列表中；为 None 时直接抛出
+        """
+        codes = bytearray()
+        coords = array('f')
+        code_ends = []
+        coord_ends = []
+        for d in paths:
+            try:
+                operators, values = _outline_stroke(d)
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors.append(e)
+                continue
+            codes.extend(operators)
+            coords.extend(values)
+            code_ends.append(len(codes))
+            coord_ends.append(len(coords))
+        return cls(bytes(codes), coords, tuple(code_ends), tuple(coord_ends))
+
+    def __len__(self):
+        """笔画数"""
+        return len(self.code_ends)
+
+    def scaled(self, size):
+        """
+        缩放到 size，返回每个笔画的 ReportLab Path 的 (points, operators)，翻转和缩放已折算进坐标
+        安装了 NumPy 时整个字的坐标一次完成缩放，否则逐个计算 (结果相同)
+        """
+        scale = _scale_factor(size)
+        if HAS_NUMPY:
+            np = lazy_import('numpy')
+            values = np.multiply(np.frombuffer(self.coords, dtype=np.float32), scale, dtype=np.float64).tolist()
+        else:
+            values = [v * scale for v in self.coords]
+
+        geometry = []
+        code_start = coord_start = 0
+        for code_end, coord_end in zip(self.code_ends, self.coord_ends):
+            geometry.append((values[coord_start:coord_end], list(self.codes[code_start:code_end])))
+            code_start, coord_start = code_end, coord_end
+        return geometry
+
+
+def geometry_to_shape(points, operators):
+    """由 (points, operators) 构建填充黑色的 ReportLab Path"""
+    from reportlab.graphics.shapes import Path, FILL_NON_ZERO
+
+    return Path(points=list(points), operators=list(operators), fillMode=FILL_NON_ZERO,
+                fillColor=colors.black, strokeColor=None)
@@ -0,0 +1,92 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TokenBucket:
+    """令牌桶限流：平均每秒 rate 次，允许 burst 次突发"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不够时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class WordsClient:
+    """组词在线接口 (Ownthink) 客户端：连接池 + 自动重试 + 限流"""
+
+    def __init__(self, url, rate=5, workers=4, timeout=5, retries=2):
+        self.url = url
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.limiter = TokenBucket(rate, burst=self.workers)
+
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def query(self, char):
+        """查询单个汉字的组词（最多 3 个），失败时返回空列表"""
+        try:
+            self.limiter.acquire()
+            response = self.session.get(self.url, params={'entity': char}, timeout=self.timeout)
+            if response.status_code == 200:
+                return self.parse_words(char, response.json())
+        except Exception:
+            pass
+        return []
+
+    def query_many(self, chars):
+        """并发查询多个汉字，返回 {汉字: 组词列表}"""
+        chars = list(chars)
+        if not chars:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chars))) as pool:
+            return dict(zip(chars, pool.map(self.query, chars)))
+
+    @staticmethod
+    def parse_words(char, data):
+        """从返回数据中提取包含该字的 2-4 字词汇"""
+        words = []
+        if data.get('message') != 'success':
+            return words
+        avp = data.get('data', {}).get('avp', [])
+        for item in avp:
+            if isinstance(item, list) and len(item) >= 2:
+                value = item[1]
+                if isinstance(value, str) and '、' in value:
+                    # 如果值中包含顿号，可能是多个词汇
+                    candidates = value.split('、')
+                    for cand in candidates:
+                        cand = cand.strip()
+                        if char in cand and 2 <= len(cand) <= 4 and cand not in words:
+                            words.append(cand)
+                            if len(words) >= 3:
+                                return words
+        return words
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+
+# 日志超过该大小时，关闭缓存时合并进快照文件
+COMPACT_THRESHOLD = 64 * 1024
+
+
+class WordsCache:
+    """
+    组词缓存：快照文件 (.words_cache.json) + 追加写日志 (.words_cache.jsonl)
+    新结果先放在内存里，定时或关闭时一次性追加到日志；日志过大时再原子地合并进快照。
+    多个进程共享 data 目录时，追加写和 os.replace 都不会产生损坏的文件；
+    并发合并时可能丢失少量条目，下次查询会重新补上。
+    """
+
+    def __init__(self, cache_file, flush_interval=30):
+        self.cache_file = cache_file
+        self.journal_file = os.path.splitext(cache_file)[0] + '.jsonl'
+        self.flush_interval = flush_interval
+        self.data = {}
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def __contains__(self, char):
+        return char in self.data
+
+    def __getitem__(self, char):
+        return self.data[char]
+
+    def __len__(self):
+        return len(self.data)
+
+    def load(self):
+        """读取快照并重放日志"""
+        self.data = self._read_snapshot(self.cache_file)
+        self._replay_journal(self.journal_file, self.data)
+        return len(self.data)
+
+    @staticmethod
+    def _read_snapshot(path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _replay_journal(path, data):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    data[entry['c']] = entry['w']
+                except (ValueError, KeyError, TypeError):
+                    continue  # 写入中断留下的半行
+
+    def set(self, char, words):
+        """记录一个查询结果（延迟写盘）"""
+        self.data[char] = words
+        self._pending[char] = words
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            try:
+                self.flush()
+            except OSError:
+                pass  # 留到下次再写
+
+    def flush(self):
+        """把未写盘的结果一次性追加到日志"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        lines = ''.join(
+            json.dumps({'c': char, 'w': words}, ensure_ascii=False) + '\n'
+            for char, words in self._pending.items()
+        )
+        os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+        # 单次 write 的追加写，多个进程同时追加也不会交错
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        self._pending.clear()
+
+    def compact(self):
+        """把日志合并进快照文件，快照通过临时文件 + os.replace 原子替换"""
+        suffix = f".{os.getpid()}.tmp"
+        claimed = self.journal_file + suffix
+        try:
+            # 先把日志改名，之后其他进程的追加会写到新的日志文件中
+            os.replace(self.journal_file, claimed)
+        except FileNotFoundError:
+            return
+        merged = self._read_snapshot(self.cache_file)
+        self._replay_journal(claimed, merged)
+        merged.update(self.data)
+        tmp_file = self.cache_file + suffix
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.cache_file)
+        os.remove(claimed)
+
+    def close(self):
+        """写回未保存的结果，日志过大时合并"""
+        self.flush()
+        try:
+            if os.path.getsize(self.journal_file) > COMPACT_THRESHOLD:
+                self.compact()
+        except OSError:
+            pass
@@ -0,0 +1,162 @@
+import os
+import re
+import sys
+import mmap
+import heapq
+import struct
+import argparse
+from collections import Counter
+
+# 作为脚本运行时，保证能导入项目内的模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.stroke_index import RECORD, find_record
+
+# 组词倒排索引格式 (小端):
+#   文件头: 魔数(4s) 版本(H) 每字词数(H) 记录数(I)
+#   记录:   按码位升序排列的 (码位 I, 偏移 Q, 长度 I)，指向文件内的词表
+#   词表:   UTF-8 编码，按词频从高到低，以 \t 分隔
+MAGIC = b'HZWX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+TOP_N = 5
+
+_HAN_WORD_RE = re.compile(r'^[\u4e00-\u9fff]{2,4}$')
+
+
+class WordsIndex:
+    """汉字 -> 常用词 的只读倒排索引（mmap）"""
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self._mm = None
+        self._count = 0
+
+    def open(self):
+        """打开索引文件，返回收录的汉字数量；文件不存在或格式不对时返回 0"""
+        if not os.path.exists(self.index_file):
+            return 0
+        with open(self.index_file, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < HEADER.size:
+            mm.close()
+            return 0
+        magic, version, _, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            return 0
+        self._mm = mm
+        self._count = count
+        return count
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, char):
+        return self._mm is not None and find_record(self._mm, HEADER.size, self._count, char) is not None
+
+    def lookup(self, char):
+        """返回按词频排序的组词列表，不存在时返回 None"""
+        if self._mm is None:
+            return None
+        loc = find_record(self._mm, HEADER.size, self._count, char)
+        if loc is None:
+            return None
+        offset, length = loc
+        return self._mm[offset:offset + length].decode('utf-8').split('\t')
+
+
+def _read_dict_lines(lines, counter):
+    """读取 jieba 词典格式 (词 [词频] [词性]) 的行"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='ignore')
+        parts = line.strip().split()
+        if not parts:
+            continue
+        freq = 1
+        if len(parts) > 1 and parts[1].isdigit():
+            freq = int(parts[1])
+        counter[parts[0]] += freq
+
+
+def _read_text_corpus(path, counter):
+    """用 jieba 对纯文本语料分词并统计词频"""
+    import jieba
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            for word in jieba.cut(line.strip()):
+                counter[word] += 1
+
+
+def build_words_index(index_file, dict_files=(), corpus_files=(), use_jieba_dict=True, top_n=TOP_N):
+    """
+    从 jieba 词典和本地语料构建倒排索引
+    :param dict_files: jieba 词典格式的文件 (词 [词频] [词性])
+    :param corpus_files: 纯文本语料，使用 jieba 分词后统计词频
+    :return: 收录的汉字数量
+    """
+    counter = Counter()
+    if use_jieba_dict:
+        import jieba
+        with jieba.get_dict_file() as f:
+            _read_dict_lines(f, counter)
+    for path in dict_files:
+        with open(path, 'r', encoding='utf-8') as f:
+            _read_dict_lines(f, counter)
+    for path in corpus_files:
+        _read_text_corpus(path, counter)
+
+    # 每个字保留词频最高的 top_n 个 2-4 字词语
+    heaps = {}
+    for word, freq in counter.items():
+        if not _HAN_WORD_RE.match(word):
+            continue
+        for char in set(word):
+            heap = heaps.setdefault(char, [])
+            item = (freq, word)
+            if len(heap) < top_n:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    chars = sorted(heaps, key=ord)
+    base = HEADER.size + RECORD.size * len(chars)
+    records = []
+    blobs = []
+    offset = base
+    for char in chars:
+        words = [word for _, word in sorted(heaps[char], reverse=True)]
+        blob = '\t'.join(words).encode('utf-8')
+        records.append(RECORD.pack(ord(char), offset, len(blob)))
+        blobs.append(blob)
+        offset += len(blob)
+
+    tmp_file = f"{index_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, top_n, len(chars)))
+        f.writelines(records)
+        f.writelines(blobs)
+    os.replace(tmp_file, index_file)
+    return len(chars)
+
+
+if __name__ == "__main__":
+    default_index = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'words_index.bin')
+    parser = argparse.ArgumentParser(description="从 jieba 词典和本地语料生成离线组词索引")
+    parser.add_argument('corpus', nargs='*', help="纯文本语料文件 (UTF-8)，使用 jieba 分词统计词频")
+    parser.add_argument('--dict', dest='dicts', action='append', default=[], help="额外的 jieba 词典格式文件，可重复指定")
+    parser.add_argument('--no-jieba-dict', action='store_true', help="不使用 jieba 自带词典")
+    parser.add_argument('--top', type=int, default=TOP_N, help=f"每个汉字保留的词数 (默认 {TOP_N})")
+    parser.add_argument('-o', '--output', default=default_index, help="索引输出路径")
+    args = parser.parse_args()
+
+    count = build_words_index(args.output, args.dicts, args.corpus,
+                              use_jieba_dict=not args.no_jieba_dict, top_n=args.top)
+    print(f"组词索引生成完成，共 {count} 个汉字: {args.output}")